@@ -6,7 +6,10 @@ class DefaultValues:
     box_colision_k_dicretisation = 10  # points / edge
     minimal_tention = 10.  # Newtons
     maximal_tention = 100.  # Newtons
+    source_mass = 50.  # kg
+    gravity = 9.8  # m/s2
     cable_diameter = 10  # mm
+    cable_young_modulus = 100000.  # N/mm2
     cable_discretisation_nb_points = 300  # points / cable
     cable_discretisation_nb_points_box_intersection = 100  # points / cable
 
@@ -24,6 +24,27 @@ class RotationOrderEnum(Enum):
     ypr = 2
 
 
+class SunPositionBackendEnum(Enum):
+    """Algorithm computing the sun's position (cf src.models.trajectoire)."""
+    unknown = 0
+    simple = 1  # cosine declination, solar time, no equation of time
+    psa = 2  # Blanco-Muriel et al. (2001), UT time and longitude
+
+
+class TensionObjectiveEnum(Enum):
+    """Criterion minimized by the tension optimization (cf src.models.tension_optimization)."""
+    unknown = 0
+    norm = 1  # sum of the squared tensions
+    peak = 2  # biggest tension
+
+
+class TensionMetricEnum(Enum):
+    """Scalar summary of the tensions over a set of poses (cf src.models.anchor_sensitivity)."""
+    unknown = 0
+    worst_tension = 1  # biggest tension of all the poses (to minimize)
+    margin = 2  # smallest distance of a tension to its limits, negative if out of them (to maximize)
+
+
 class BoxVertexOrderEnum(Enum):
     """
     Logic for the order of the vertices of a box.
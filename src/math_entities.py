@@ -5,7 +5,7 @@ from numpy.linalg import norm
 
 from deprecated import deprecated
 from copy import deepcopy
-from typing import Tuple, Union
+from typing import Tuple, Union, Iterable
 from threading import Thread
 from abc import ABC, abstractmethod
 
@@ -345,16 +345,16 @@ class RotationMatrix(matrix):
     # *********************************** strings to create matrices in numpy ***********************************
     # rot in X
     _ROTATION_X_STR = '1,   0,    0 ;' + \
-                      '0, {c}, -{s} ;' + \
+                      '0, {c}, {ms} ;' + \
                       '0, {s},  {c}  '
 
     # rot in Y
     _ROTATION_Y_STR = ' {c}, 0, {s} ;' + \
                       '   0, 1,   0 ;' + \
-                      '-{s}, 0, {c}  '
+                      '{ms}, 0, {c}  '
 
     # rot in Z
-    _ROTATION_Z_STR = '{c}, -{s}, 0 ;' + \
+    _ROTATION_Z_STR = '{c}, {ms}, 0 ;' + \
                       '{s},  {c}, 0 ;' + \
                       '  0,    0, 1  '
 
@@ -371,9 +371,9 @@ class RotationMatrix(matrix):
         """Call Matrix's new with a string template."""
         # convert to radians (if necessary) --> for numpy functions
         radians = value if unity == AngleUnityEnum.radian else value * pi / 180
-        # format the creation string
+        # format the creation string (ms: minus sine, '-{s}' would give '--' for the negative sines)
         str_ = cls._ROTATION_STR_SWITCH[angle]
-        str_ = str_.format(s=sin(radians), c=cos(radians))
+        str_ = str_.format(s=sin(radians), ms=-sin(radians), c=cos(radians))
         # call the constructor of Matrix
         return super(RotationMatrix, cls).__new__(cls, str_)
 
@@ -749,6 +749,217 @@ class SphericalCoordinateSystem:
         )
 
 
+# _elementary_rotations
+def _elementary_rotations(radians: ndarray, derivative: bool = False) -> Tuple[ndarray, ndarray, ndarray]:
+    """(..., 3, 3) rotation matrices around x, y and z (or their derivatives) for (..., 3) angles in radians."""
+    # derivative: cos -> -sin, sin -> cos, constant 1 -> 0
+    c, s = (-sin(radians), cos(radians)) if derivative else (cos(radians), sin(radians))
+    zeros = np.zeros(radians.shape[:-1])
+    ones = zeros if derivative else np.ones(radians.shape[:-1])
+    # row (rotation around x)
+    matrix_x = np.stack([
+        np.stack([ones, zeros, zeros], axis=-1),
+        np.stack([zeros, c[..., 0], -s[..., 0]], axis=-1),
+        np.stack([zeros, s[..., 0], c[..., 0]], axis=-1),
+    ], axis=-2)
+    # pitch (rotation around y)
+    matrix_y = np.stack([
+        np.stack([c[..., 1], zeros, s[..., 1]], axis=-1),
+        np.stack([zeros, ones, zeros], axis=-1),
+        np.stack([-s[..., 1], zeros, c[..., 1]], axis=-1),
+    ], axis=-2)
+    # yaw (rotation around z)
+    matrix_z = np.stack([
+        np.stack([c[..., 2], -s[..., 2], zeros], axis=-1),
+        np.stack([s[..., 2], c[..., 2], zeros], axis=-1),
+        np.stack([zeros, zeros, ones], axis=-1),
+    ], axis=-2)
+    return matrix_x, matrix_y, matrix_z
+
+
+# _to_radians
+def _to_radians(angles: ndarray, order: RotationOrderEnum, unity: AngleUnityEnum) -> ndarray:
+    """Validate the order and the unity and return the angles array in radians."""
+    # check the order and the unity
+    assert order != RotationOrderEnum.unknown, f'The rotation order cannot be unknown.'
+    assert unity != AngleUnityEnum.unknown, f'The angle unity cannot be unknown.'
+    # convert to radians (if necessary)
+    angles = np.asarray(angles, dtype=float)
+    return angles if unity == AngleUnityEnum.radian else angles * pi / 180
+
+
+# rotation_matrices
+def rotation_matrices(angles: ndarray, order: RotationOrderEnum = RotationOrderEnum.ypr,
+                      unity: AngleUnityEnum = AngleUnityEnum.degree) -> ndarray:
+    """
+    Vectorized equivalent of Orientation.rotation_matrix.
+    angles is a (..., 3) array with the columns (row, pitch, yaw), the result is a (..., 3, 3) array.
+    """
+    matrix_x, matrix_y, matrix_z = _elementary_rotations(_to_radians(angles, order, unity))
+    # multiplication for row-pitch-yaw
+    if order == RotationOrderEnum.rpy:
+        return np.matmul(matrix_x, np.matmul(matrix_y, matrix_z))
+    # multiplication for yaw-pitch-row
+    else:
+        return np.matmul(matrix_z, np.matmul(matrix_y, matrix_x))
+
+
+# rotation_matrices_derivatives
+def rotation_matrices_derivatives(angles: ndarray, order: RotationOrderEnum = RotationOrderEnum.ypr,
+                                  unity: AngleUnityEnum = AngleUnityEnum.degree) -> ndarray:
+    """
+    Derivatives of rotation_matrices with respect to (row, pitch, yaw) IN RADIANS, whatever the given unity.
+    The result is a (..., 3, 3, 3) array, the first of the last 3 axes being the angle.
+    """
+    radians = _to_radians(angles, order, unity)
+    x, y, z = _elementary_rotations(radians)
+    dx, dy, dz = _elementary_rotations(radians, derivative=True)
+    # product rule
+    if order == RotationOrderEnum.rpy:
+        derivatives = [dx @ y @ z, x @ dy @ z, x @ y @ dz]
+    else:
+        derivatives = [z @ y @ dx, z @ dy @ x, dz @ y @ x]
+    return np.stack(derivatives, axis=-3)
+
+
+# rotation_matrices_to_angles
+def rotation_matrices_to_angles(matrices: ndarray, order: RotationOrderEnum = RotationOrderEnum.ypr,
+                                unity: AngleUnityEnum = AngleUnityEnum.degree) -> ndarray:
+    """
+    Inverse of rotation_matrices: (..., 3, 3) matrices -> (..., 3) angles (row, pitch, yaw), pitch in [-90, 90].
+    At the singularity (pitch = +-90) the row is set to 0.
+    """
+    assert order != RotationOrderEnum.unknown, f'The rotation order cannot be unknown.'
+    assert unity != AngleUnityEnum.unknown, f'The angle unity cannot be unknown.'
+    m = np.asarray(matrices, dtype=float)
+    # row-pitch-yaw: R = Rx Ry Rz
+    if order == RotationOrderEnum.rpy:
+        pitches = np.arcsin(np.clip(m[..., 0, 2], -1., 1.))
+        singular = np.abs(m[..., 0, 2]) > 1 - 1e-12
+        rows = np.where(singular, 0., np.arctan2(-m[..., 1, 2], m[..., 2, 2]))
+        yaws = np.where(singular, np.arctan2(m[..., 1, 0], m[..., 1, 1]), np.arctan2(-m[..., 0, 1], m[..., 0, 0]))
+    # yaw-pitch-row: R = Rz Ry Rx
+    else:
+        pitches = -np.arcsin(np.clip(m[..., 2, 0], -1., 1.))
+        singular = np.abs(m[..., 2, 0]) > 1 - 1e-12
+        rows = np.where(singular, 0., np.arctan2(m[..., 2, 1], m[..., 2, 2]))
+        yaws = np.where(singular, np.arctan2(-m[..., 0, 1], m[..., 1, 1]), np.arctan2(m[..., 1, 0], m[..., 0, 0]))
+    angles = np.stack([rows, pitches, yaws], axis=-1)
+    return angles if unity == AngleUnityEnum.radian else angles * 180 / pi
+
+
+# PoseBatch
+class PoseBatch:
+    """
+    (immutable) N poses (center + orientation) of a rigid body stored as arrays.
+    Centers are a (N, 3) array (mm) and angles a (N, 3) array with the columns (row, pitch, yaw).
+    """
+
+    # from_configurations
+    @staticmethod
+    def from_configurations(configurations: Iterable[Tuple[Point, Orientation]]) -> 'PoseBatch':
+        """Create a batch from (center, orientation) pairs (ex: TrajectoryTranslator.get_config_list)."""
+        configurations = list(configurations)
+        assert configurations, 'At least one configuration must be given.'
+        # all the orientations must be in the same order and unity
+        order, unity = configurations[0][1]._order, configurations[0][1].unity
+        assert all(o._order == order and o.unity == unity for _, o in configurations), \
+            'All the orientations must have the same order and unity.'
+        centers = [c.get_tuple() for c, _ in configurations]
+        angles = [(o._row, o._pitch, o._yaw) for _, o in configurations]
+        return PoseBatch(centers, angles, order=order, unity=unity)
+
+    # init
+    def __init__(self, centers: ndarray, angles: ndarray,
+                 order: RotationOrderEnum = RotationOrderEnum.ypr,
+                 unity: AngleUnityEnum = AngleUnityEnum.degree):
+        """Validate and store (read only copies of) the arrays."""
+        centers = np.array(centers, dtype=float, ndmin=2)
+        angles = np.array(angles, dtype=float, ndmin=2)
+        # validate values
+        assert centers.ndim == 2 and centers.shape[1] == 3, f'centers must be (N, 3) (shape = {centers.shape}).'
+        assert angles.shape == centers.shape, f'angles must be (N, 3) (shape = {angles.shape}).'
+        assert np.all(isfinite(centers)) and np.all(isfinite(angles)), 'Centers and angles must be finite.'
+        # check the order and the unity
+        assert order != RotationOrderEnum.unknown, f'The rotation order cannot be unknown.'
+        assert unity != AngleUnityEnum.unknown, f'The angle unity cannot be unknown.'
+        # assign attributes
+        centers.flags.writeable = False
+        angles.flags.writeable = False
+        self._centers = centers
+        self._angles = angles
+        self._order = order
+        self._unity = unity
+        # computed only if needed
+        self._rotation_matrices = None
+
+    # len
+    def __len__(self) -> int:
+        """Number of poses."""
+        return self._centers.shape[0]
+
+    # [] operator
+    def __getitem__(self, item) -> 'PoseBatch':
+        """Sub batch (slice, indices or boolean mask)."""
+        return PoseBatch(self._centers[item], self._angles[item], order=self._order, unity=self._unity)
+
+    # centers
+    @property
+    def centers(self) -> ndarray:
+        """(N, 3) array of centers (read only)."""
+        return self._centers
+
+    # angles
+    @property
+    def angles(self) -> ndarray:
+        """(N, 3) array of angles (row, pitch, yaw) in the batch's unity (read only)."""
+        return self._angles
+
+    # order
+    @property
+    def order(self) -> RotationOrderEnum:
+        """Sequence of the rotations."""
+        return self._order
+
+    # unity
+    @property
+    def unity(self) -> AngleUnityEnum:
+        """Unity of the angles (º, radians)."""
+        return self._unity
+
+    # get_angles
+    def get_angles(self, unity: AngleUnityEnum = AngleUnityEnum.degree) -> ndarray:
+        """(N, 3) array of angles (row, pitch, yaw) in the given unity (degree by default)."""
+        # check the unity
+        assert unity != AngleUnityEnum.unknown, f'The angle unity cannot be unknown.'
+        # same unity
+        if unity == self._unity:
+            return self._angles
+        # asked degree but is radian
+        elif unity == AngleUnityEnum.degree:
+            return self._angles * 180 / pi
+        # asked radian but is degree
+        else:
+            return self._angles * pi / 180
+
+    # rotation_matrices
+    @property
+    def rotation_matrices(self) -> ndarray:
+        """(N, 3, 3) array of rotation matrices (computed once)."""
+        if self._rotation_matrices is None:
+            self._rotation_matrices = rotation_matrices(self._angles, order=self._order, unity=self._unity)
+            self._rotation_matrices.flags.writeable = False
+        return self._rotation_matrices
+
+    # transform
+    def transform(self, points_from_self_ref: ndarray) -> ndarray:
+        """Points seen from the body's reference frame, (P, 3) or (N, P, 3), to the global frame -> (N, P, 3)."""
+        points = np.asarray(points_from_self_ref, dtype=float)
+        points = np.broadcast_to(points, (len(self),) + points.shape[-2:])
+        # rotate then translate
+        return np.einsum('nij,npj->npi', self.rotation_matrices, points) + self._centers[:, np.newaxis, :]
+
+
 @deprecated('Use something from numpy!!!!!')
 class SpaceRechercheAnglesLimites:
     # np.arange !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
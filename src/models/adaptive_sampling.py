@@ -0,0 +1,150 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+from typing import Callable
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout
+from src.models.trajectoire import TrajectoryTranslator
+from src.toolbox.useful import secondes_dans_horaire
+
+
+# AdaptiveSampling
+class AdaptiveSampling:
+    """Instants (s) of an adaptively sampled trajectory with their poses and cable lengths (mm)."""
+
+    # init
+    def __init__(self, times: ndarray, poses: PoseBatch, lengths: ndarray, n_evaluations: int, n_refinements: int):
+        """(N,) times, N poses and (N, C) lengths, sorted by time."""
+        self._times = times
+        self._poses = poses
+        self._lengths = lengths
+        self._n_evaluations = n_evaluations
+        self._n_refinements = n_refinements
+
+    # len
+    def __len__(self):
+        return self._times.size
+
+    # times
+    @property
+    def times(self) -> ndarray:
+        return self._times
+
+    # poses
+    @property
+    def poses(self) -> PoseBatch:
+        return self._poses
+
+    # lengths
+    @property
+    def lengths(self) -> ndarray:
+        return self._lengths
+
+    # n_evaluations
+    @property
+    def n_evaluations(self) -> int:
+        """Number of poses (and inverse kinematics) that were evaluated, all of them are kept."""
+        return self._n_evaluations
+
+    # n_refinements
+    @property
+    def n_refinements(self) -> int:
+        """Number of bisection passes after the initial grid."""
+        return self._n_refinements
+
+    # steps
+    @property
+    def steps(self) -> ndarray:
+        """(N - 1,) time steps (s) between consecutive samples."""
+        return np.diff(self._times)
+
+    # uniform_equivalent
+    @property
+    def uniform_equivalent(self) -> int:
+        """Number of samples a uniform grid with the smallest step would need."""
+        if self._times.size < 2:
+            return self._times.size
+        return int(np.ceil((self._times[-1] - self._times[0]) / np.min(self.steps))) + 1
+
+
+# _get_changes
+def _get_changes(centers: ndarray, angles: ndarray, lengths: ndarray):
+    """Biggest change of length (mm), center's displacement (mm) and angle change (degrees) between samples."""
+    length_changes = np.max(np.abs(np.diff(lengths, axis=0)), axis=1)
+    center_changes = np.linalg.norm(np.diff(centers, axis=0), axis=1)
+    # wrapped in [-180, 180)
+    angle_changes = np.max(np.abs((np.diff(angles, axis=0) + 180) % 360 - 180), axis=1)
+    return length_changes, center_changes, angle_changes
+
+
+# sample_adaptively
+def sample_adaptively(pose_function: Callable[[ndarray], PoseBatch], start: float, stop: float,
+                      cable_layout: CableLayout, dimensions: BoxDimensions, length_tolerance: float = 10.,
+                      center_tolerance: float = None, angle_tolerance: float = None,
+                      max_step: float = 600., min_step: float = 1.) -> AdaptiveSampling:
+    """
+    Sample [start, stop] (s) so that no cable length changes by more than length_tolerance (mm) between consecutive
+    samples (nor the center by center_tolerance in mm, nor an angle by angle_tolerance in degrees, if given).
+    Starting from a grid with max_step, the intervals over a tolerance are bisected, all of them in one batch of
+    pose_function (times -> PoseBatch) and inverse kinematics per pass, until they pass or reach min_step.
+    Only the samples are checked: a change between two close enough samples is not seen.
+    """
+    # validations
+    assert isfinite(start) and isfinite(stop) and stop > start, f'invalid interval ({start}, {stop})'
+    assert isfinite(length_tolerance) and length_tolerance > 0, f'invalid length_tolerance ({length_tolerance})'
+    assert center_tolerance is None or center_tolerance > 0, f'invalid center_tolerance ({center_tolerance})'
+    assert angle_tolerance is None or angle_tolerance > 0, f'invalid angle_tolerance ({angle_tolerance})'
+    assert isfinite(max_step) and max_step >= min_step > 0, f'invalid steps ({min_step}, {max_step})'
+    center_tolerance = center_tolerance if center_tolerance is not None else np.inf
+    angle_tolerance = angle_tolerance if angle_tolerance is not None else np.inf
+
+    # evaluate
+    def evaluate(instants):
+        poses = pose_function(instants)
+        assert len(poses) == instants.size, 'pose_function must return one pose per time.'
+        return poses.order, poses.centers, poses.get_angles(AngleUnityEnum.degree), \
+            cable_layout.get_lengths(poses, dimensions)
+
+    times = np.linspace(start, stop, int(np.ceil((stop - start) / max_step)) + 1)
+    order, centers, angles, lengths = evaluate(times)
+    n_evaluations, n_refinements = times.size, 0
+    while True:
+        length_changes, center_changes, angle_changes = _get_changes(centers, angles, lengths)
+        refine = (length_changes > length_tolerance) | (center_changes > center_tolerance) | \
+            (angle_changes > angle_tolerance)
+        # the halves must not be under min_step
+        refine &= np.diff(times) >= 2 * min_step
+        if not np.any(refine):
+            break
+        intervals = np.flatnonzero(refine)
+        new_times = (times[intervals] + times[intervals + 1]) / 2
+        _, new_centers, new_angles, new_lengths = evaluate(new_times)
+        # the new samples go right after the start of their interval
+        times = np.insert(times, intervals + 1, new_times)
+        centers = np.insert(centers, intervals + 1, new_centers, axis=0)
+        angles = np.insert(angles, intervals + 1, new_angles, axis=0)
+        lengths = np.insert(lengths, intervals + 1, new_lengths, axis=0)
+        n_evaluations += new_times.size
+        n_refinements += 1
+    poses = PoseBatch(centers, angles, order=order, unity=AngleUnityEnum.degree)
+    return AdaptiveSampling(times, poses, lengths, n_evaluations, n_refinements)
+
+
+# sample_trajectory
+def sample_trajectory(translator: TrajectoryTranslator, cable_layout: CableLayout, dimensions: BoxDimensions,
+                      **kwargs) -> AdaptiveSampling:
+    """
+    Adaptive sampling of the translator's trajectory between its initial and final hours (on its date),
+    instead of its fixed intervalle. kwargs go to sample_adaptively.
+    """
+    trajectory = translator.traj
+
+    # pose_function
+    def pose_function(seconds):
+        return translator.get_poses(*trajectory.get_positions_soleil(seconds))
+
+    return sample_adaptively(pose_function, secondes_dans_horaire(trajectory.heure_initiale),
+                             secondes_dans_horaire(trajectory.heure_finale), cable_layout, dimensions, **kwargs)
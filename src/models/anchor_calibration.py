@@ -0,0 +1,114 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+
+from src.math_entities import Point, PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout, CableEnds
+
+
+# AnchorCalibration
+class AnchorCalibration:
+    """Fixed points estimated from measured cable lengths (C cables) and the quality of the fit."""
+
+    # init
+    def __init__(self, cable_layout: CableLayout, offsets: ndarray, residuals: ndarray, iterations: int):
+        """Store the results."""
+        self._cable_layout = cable_layout
+        self._offsets = offsets
+        self._residuals = residuals
+        self._iterations = iterations
+
+    # cable_layout
+    @property
+    def cable_layout(self) -> CableLayout:
+        """Corrected cable layout (same source vertices, calibrated fixed points)."""
+        return self._cable_layout
+
+    # fixed_points_array
+    @property
+    def fixed_points_array(self) -> ndarray:
+        """(C, 3) array of the calibrated fixed points (mm), cf CableLayout.fixed_points_array."""
+        return self._cable_layout.fixed_points_array
+
+    # offsets
+    @property
+    def offsets(self) -> ndarray:
+        """(C,) length offsets of the measures (mm), zeros if they were not estimated."""
+        return self._offsets
+
+    # residuals
+    @property
+    def residuals(self) -> ndarray:
+        """(N, C) modeled minus measured lengths after the calibration (mm)."""
+        return self._residuals
+
+    # rms
+    @property
+    def rms(self) -> ndarray:
+        """(C,) root mean square of the residuals of each cable (mm)."""
+        return np.sqrt(np.mean(self._residuals ** 2, axis=0))
+
+    # iterations
+    @property
+    def iterations(self) -> int:
+        """Number of Gauss-Newton iterations."""
+        return self._iterations
+
+
+# calibrate_anchors
+def calibrate_anchors(cable_layout: CableLayout, dimensions: BoxDimensions, poses: PoseBatch,
+                      measured_lengths: ndarray, estimate_offsets: bool = False,
+                      tolerance: float = 1e-6, max_iterations: int = 50) -> AnchorCalibration:
+    """
+    Estimate the real fixed points from N recorded (commanded pose, measured lengths) pairs.
+    Each cable is an independent least squares problem (its fixed point, plus a length offset if estimate_offsets),
+    all of them are solved together with a vectorized Gauss-Newton starting from the nominal fixed points.
+    The cables are modeled as straight lines, the layout's pulleys and elasticity are only carried over.
+    tolerance (mm) is on the biggest update of the fixed points.
+    """
+    measured_lengths = np.array(measured_lengths, dtype=float, ndmin=2)
+    # validations
+    assert measured_lengths.shape == (len(poses), 8), 'measured_lengths must be (N, 8), one line per pose.'
+    assert np.all(isfinite(measured_lengths)), 'measured lengths must be finite.'
+    assert isfinite(tolerance) and tolerance > 0, f'invalid tolerance ({tolerance})'
+    assert type(max_iterations) == int and max_iterations > 0, 'max_iterations must be an int and > 0.'
+    n_unknowns = 4 if estimate_offsets else 3
+    assert len(poses) >= n_unknowns, f'At least {n_unknowns} poses are needed.'
+    # where the cables are attached to the source (N, C, 3) -> it does not depend on the fixed points
+    source_points = cable_layout.get_source_points(poses, dimensions)
+    # unknowns (C, 3) and (C,)
+    fixed_points = cable_layout.fixed_points_array.astype(float)
+    offsets = np.zeros(fixed_points.shape[0])
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        # model and residuals (N, C)
+        vectors = source_points - fixed_points
+        lengths = np.sqrt(np.sum(vectors * vectors, axis=-1))
+        residuals = lengths + offsets - measured_lengths
+        # jacobians (C, N, unknowns): d length / d fixed point = - direction, d length / d offset = 1
+        jacobians = -vectors / lengths[..., np.newaxis]
+        if estimate_offsets:
+            jacobians = np.concatenate([jacobians, np.ones(lengths.shape + (1,))], axis=-1)
+        jacobians = jacobians.transpose(1, 0, 2)
+        # normal equations of all the cables at once
+        jtj = np.einsum('cni,cnj->cij', jacobians, jacobians)
+        jtr = np.einsum('cni,nc->ci', jacobians, residuals)
+        steps = -np.linalg.solve(jtj, jtr[..., np.newaxis])[..., 0]
+        # update
+        fixed_points += steps[:, :3]
+        if estimate_offsets:
+            offsets += steps[:, 3]
+        if np.max(np.abs(steps[:, :3])) < tolerance:
+            break
+    # final residuals
+    vectors = source_points - fixed_points
+    residuals = np.sqrt(np.sum(vectors * vectors, axis=-1)) + offsets - measured_lengths
+    # corrected layout (same names and vertices)
+    cables_ends = [
+        CableEnds(Point(*fixed_point, name=cable_layout.get_fixed_point(vertex).name), vertex)
+        for vertex, fixed_point in zip(cable_layout.source_vertices, fixed_points)
+    ]
+    corrected = CableLayout(cables_ends, diameter=cable_layout.diameter,
+                            pulleys=cable_layout.pulleys, elasticity=cable_layout.elasticity)
+    return AnchorCalibration(corrected, offsets, residuals, iterations)
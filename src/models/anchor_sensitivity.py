@@ -0,0 +1,113 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+
+from src.enums import TensionMetricEnum
+from src.math_entities import PoseBatch
+from src.models.tension import force_distribution, force_distribution_improved
+from src.models.wrench import WrenchModel
+
+
+# AnchorSensitivity
+class AnchorSensitivity:
+    """Value of a tension metric over a set of poses and its gradient with respect to the fixed points (C cables)."""
+
+    # init
+    def __init__(self, metric: TensionMetricEnum, value: float, gradients: ndarray):
+        """Store the results."""
+        self._metric = metric
+        self._value = value
+        self._gradients = gradients
+
+    # metric
+    @property
+    def metric(self) -> TensionMetricEnum:
+        return self._metric
+
+    # value
+    @property
+    def value(self) -> float:
+        """Metric (N) with the current fixed points."""
+        return self._value
+
+    # gradients
+    @property
+    def gradients(self) -> ndarray:
+        """(C, 3) derivatives of the metric with respect to the fixed points' coordinates (N/mm)."""
+        return self._gradients
+
+    # improving_direction
+    @property
+    def improving_direction(self) -> ndarray:
+        """(C, 3) gradient descent (worst tension) or ascent (margin) direction."""
+        return -self._gradients if self._metric == TensionMetricEnum.worst_tension else self._gradients
+
+
+# _tension_metrics
+def _tension_metrics(tensions: ndarray, f_min: ndarray, f_max: ndarray, metric: TensionMetricEnum) -> ndarray:
+    """(..., N, C) tensions -> (...) metric over the N poses (singular poses, NaN, are ignored)."""
+    with np.errstate(invalid='ignore'):
+        if metric == TensionMetricEnum.worst_tension:
+            return np.nanmax(np.max(tensions, axis=-1), axis=-1)
+        elif metric == TensionMetricEnum.margin:
+            margins = np.minimum(tensions - f_min, f_max - tensions)
+            return np.nanmin(np.min(margins, axis=-1), axis=-1)
+        else:
+            raise Exception(f'Unknown metric {metric}.')
+
+
+# get_anchor_sensitivity
+def get_anchor_sensitivity(wrench_model: WrenchModel, poses: PoseBatch,
+                           metric: TensionMetricEnum = TensionMetricEnum.worst_tension,
+                           step: float = 1., improved: bool = True) -> AnchorSensitivity:
+    """
+    Gradient of the metric over the poses with respect to each coordinate of each fixed point, by central differences.
+    All the 6 C perturbed layouts are evaluated on all the poses in a single batch of force distributions,
+    (6 C + 1) x N poses: split the poses if it does not fit in memory.
+    step in mm. As a max/min over the poses, the metric is only piecewise differentiable.
+    """
+    assert isfinite(step) and step > 0, f'invalid step ({step})'
+    assert metric != TensionMetricEnum.unknown, 'The metric cannot be unknown.'
+    n_cables = wrench_model.n_cables
+    # the source does not depend on the fixed points: attachments (N, C, 3)
+    directions, moment_arms = wrench_model.get_directions_and_moment_arms(poses)
+    attachments = wrench_model.fixed_points - directions * wrench_model.get_lengths(poses)[..., np.newaxis]
+    # fixed points (V, C, 3): current one, then +step and -step on each coordinate
+    perturbations = (step * np.eye(3 * n_cables)).reshape((3 * n_cables, n_cables, 3))
+    fixed_points = wrench_model.fixed_points + np.concatenate([np.zeros((1, n_cables, 3)),
+                                                                perturbations, -perturbations])
+    # cables of all the variants (V, N, C, 3)
+    vectors = fixed_points[:, np.newaxis, :, :] - attachments
+    with np.errstate(invalid='ignore'):
+        directions = vectors / np.sqrt(np.sum(vectors * vectors, axis=-1))[..., np.newaxis]
+    moment_arms = np.broadcast_to(moment_arms, directions.shape)
+    method = force_distribution_improved if improved else force_distribution
+    tensions = method(directions, moment_arms, wrench_model.get_wrenches(poses),
+                      wrench_model.f_min, wrench_model.f_max).tensions
+    values = _tension_metrics(tensions, wrench_model.f_min, wrench_model.f_max, metric)
+    # central differences
+    plus, minus = values[1:3 * n_cables + 1], values[3 * n_cables + 1:]
+    gradients = ((plus - minus) / (2 * step)).reshape((n_cables, 3))
+    return AnchorSensitivity(metric, float(values[0]), gradients)
+
+
+# propose_fixed_points
+def propose_fixed_points(wrench_model: WrenchModel, poses: PoseBatch, step_size: float,
+                         metric: TensionMetricEnum = TensionMetricEnum.worst_tension, movable: ndarray = None,
+                         lower_bounds: ndarray = None, upper_bounds: ndarray = None, **kwargs) -> ndarray:
+    """
+    (C, 3) fixed points moved by step_size (mm, on the biggest coordinate change) along the improving direction.
+    movable: (C, 3) boolean mask of the coordinates allowed to change (all of them by default),
+    lower_bounds and upper_bounds: (3,) or (C, 3) limits (ex: the room's walls). kwargs go to get_anchor_sensitivity.
+    """
+    assert isfinite(step_size) and step_size > 0, f'invalid step_size ({step_size})'
+    direction = get_anchor_sensitivity(wrench_model, poses, metric, **kwargs).improving_direction
+    if movable is not None:
+        direction = np.where(movable, direction, 0.)
+    biggest = np.max(np.abs(direction))
+    fixed_points = wrench_model.fixed_points.copy()
+    if biggest > 0:
+        fixed_points += step_size * direction / biggest
+    lower_bounds = lower_bounds if lower_bounds is not None else -np.inf
+    upper_bounds = upper_bounds if upper_bounds is not None else np.inf
+    return np.clip(fixed_points, lower_bounds, upper_bounds)
@@ -1,6 +1,7 @@
 from deprecated import deprecated
 from copy import deepcopy
-from numpy import arcsin, degrees, radians, cos, sin, sqrt, isfinite
+import numpy as np
+from numpy import arcsin, degrees, radians, cos, sin, sqrt, isfinite, ndarray
 from typing import Dict, Tuple, List
 
 from src.enums import RotationOrderEnum, AngleUnityEnum, BoxVertexEnum, BoxVertexOrderEnum
@@ -75,6 +76,16 @@ class BoxDimensions:
         """Return the tuple (length, width, height)."""
         return self.length, self.width, self.height
 
+    # get_vertices_array
+    def get_vertices_array(self) -> ndarray:
+        """(8, 3) array of the vertices of a box at the origin, in the standard order (XYZ). Cf BoxVertexEnum."""
+        # halves of the dimensions
+        halves = np.array(self.get_tuple()) / 2
+        # signs of the vertices v000, v100, v010, v110, v001, v101, v011, v111
+        signs = np.array([[-1, -1, -1], [+1, -1, -1], [-1, +1, -1], [+1, +1, -1],
+                          [-1, -1, +1], [+1, -1, +1], [-1, +1, +1], [+1, +1, +1]])
+        return signs * halves
+
 
 # Box
 class Box(AbsFollower):
@@ -312,6 +323,18 @@ class Box(AbsFollower):
         # logic
         return self._is_in_box_at_origin(point_from_box, self.dimensions)
 
+    # are_in_box
+    def are_in_box(self, points: ndarray) -> ndarray:
+        """Vectorized is_in_box: (..., 3) array of points -> (...) array of bools."""
+        points = np.asarray(points, dtype=float)
+        # rotation matrix (its transpose undoes the rotation)
+        rot = np.asarray(self.orientation.rotation_matrix)
+        # points from the box's center point of view
+        points_from_box = (points - np.asarray(self.center.get_tuple())).dot(rot)
+        # check if the points are between +/- the half-measures
+        halves = np.asarray(self.dimensions.get_tuple()) / 2
+        return np.all(np.abs(points_from_box) <= halves, axis=-1)
+
     # _is_coliding (the logic)
     def _is_coliding(self, other_box: 'Box', k_discretisation=None) -> bool:
         """
@@ -1,15 +1,17 @@
-from typing import List, Dict, Generator
+from typing import List, Dict, Generator, Tuple
 from copy import deepcopy
 from deprecated import deprecated
 
-from numpy import isfinite
+import numpy as np
+from numpy import isfinite, ndarray
 
 from src.enums import BoxVertexEnum
-from src.math_entities import Point, Vec3, MobilePoint
-from src.models.boxes import Box
+from src.math_entities import Point, Vec3, MobilePoint, PoseBatch, rotation_matrices_derivatives
+from src.models.boxes import Box, BoxDimensions
 from src.toolbox.useful import solutions_formule_quadratique
 from src.configs import DefaultValues
 from src.toolbox.followables import AbsFollower
+from src.models.kinematics import ForwardKinematics
 
 
 # CableEnds
@@ -48,6 +50,85 @@ class CableEnds:
             raise KeyError('source_point or fixed_point')
 
 
+# PulleyGeometry
+class PulleyGeometry:
+    """
+    Pulleys at the fixed points (all with the same radius).
+    The cable arrives at the fixed point along the pulley's swivel axis, wraps around the pulley
+    (which turns around that axis to face the source) and leaves tangentially towards the source.
+    """
+
+    # init
+    def __init__(self, radius: float, swivel_axes: ndarray = None):
+        """Radius in mm. Swivel axes (3,) or (C, 3) point from the pulleys to the winches (vertical by default)."""
+        # validations
+        assert isfinite(radius) and radius > 0, f'invalid radius ({radius})'
+        swivel_axes = np.array(swivel_axes if swivel_axes is not None else (0., 0., 1.), dtype=float)
+        assert swivel_axes.shape[-1] == 3 and np.all(isfinite(swivel_axes)), 'invalid swivel axes.'
+        # assign attributes
+        self._radius = radius
+        self._swivel_axes = swivel_axes / np.linalg.norm(swivel_axes, axis=-1, keepdims=True)
+
+    # radius
+    @property
+    def radius(self) -> float:
+        """Pulleys' radius in mm."""
+        return self._radius
+
+    # get_lengths_and_exit_points
+    def get_lengths_and_exit_points(self, fixed_points: ndarray, source_points: ndarray) -> Tuple[ndarray, ndarray]:
+        """
+        Cable lengths from the fixed points (wrapped part + free part) and points where the cables leave the pulleys.
+        fixed_points (C, 3) and source_points (..., C, 3) -> lengths (..., C) and exit points (..., C, 3).
+        """
+        axes = np.broadcast_to(self._swivel_axes, source_points.shape)
+        relative = source_points - fixed_points
+        # the pulley turns to the source: horizontal direction (perpendicular to the swivel axis)
+        horizontal = relative - np.sum(relative * axes, axis=-1, keepdims=True) * axes
+        horizontal_norms = np.linalg.norm(horizontal, axis=-1, keepdims=True)
+        horizontal = horizontal / np.where(horizontal_norms > 1e-9, horizontal_norms, 1.)
+        # pulley's center and source point in the pulley's plane (center at the origin)
+        centers = fixed_points + self._radius * horizontal
+        x = np.sum((source_points - centers) * horizontal, axis=-1)
+        y = np.sum((source_points - centers) * axes, axis=-1)
+        distances = np.maximum(np.sqrt(x ** 2 + y ** 2), self._radius)
+        # tangent point (the cable goes around the pulley from the fixed point, at the angle pi)
+        exit_angles = np.arctan2(y, x) - np.arccos(self._radius / distances)
+        wrap_angles = np.mod(exit_angles - np.pi, 2 * np.pi)
+        lengths = self._radius * wrap_angles + np.sqrt(distances ** 2 - self._radius ** 2)
+        exit_points = centers + self._radius * (np.cos(exit_angles)[..., np.newaxis] * horizontal +
+                                                np.sin(exit_angles)[..., np.newaxis] * axes)
+        return lengths, exit_points
+
+
+# CableElasticity
+class CableElasticity:
+    """Linear elastic cables: elongation = length * tension / (E * A)."""
+
+    # init
+    def __init__(self, young_modulus: float = None, diameter: float = None):
+        """Young modulus in N/mm2 (MPa) and diameter in mm (the layout's diameter if not given)."""
+        if young_modulus:
+            assert isfinite(young_modulus) and young_modulus > 0, f'invalid young_modulus ({young_modulus})'
+        if diameter:
+            assert isfinite(diameter) and diameter > 0, f'invalid diameter ({diameter})'
+        # assign attributes
+        self._young_modulus = young_modulus if young_modulus else DefaultValues.cable_young_modulus
+        self._diameter = diameter
+
+    # get_axial_stiffness
+    def get_axial_stiffness(self, diameter: float = None) -> float:
+        """E * A in Newtons (diameter in mm, the one given at init has priority)."""
+        diameter = self._diameter if self._diameter else diameter
+        assert diameter, 'a diameter is needed.'
+        return self._young_modulus * np.pi * diameter ** 2 / 4
+
+    # get_unstretched_lengths
+    def get_unstretched_lengths(self, lengths: ndarray, tensions: ndarray, diameter: float = None) -> ndarray:
+        """Lengths (mm) that stretch to the given lengths under the given tensions (N)."""
+        return lengths / (1 + np.asarray(tensions) / self.get_axial_stiffness(diameter))
+
+
 # CableLayout
 class CableLayout:
     """
@@ -56,8 +137,9 @@ class CableLayout:
     """
 
     # init
-    def __init__(self, cables_ends: List[CableEnds], diameter: float = None):
-        """"""
+    def __init__(self, cables_ends: List[CableEnds], diameter: float = None,
+                 pulleys: PulleyGeometry = None, elasticity: CableElasticity = None):
+        """Pulleys and elasticity are optional (ideal straight and rigid cables by default)."""
         # validations
         assert len(cables_ends) == 8, 'Exactly 8 cable ends must be given.'
         assert all(type(ce) == CableEnds for ce in cables_ends), f'cable ends must be of type {CableEnds.__name__}.'
@@ -66,6 +148,8 @@ class CableLayout:
         # assign attributes
         self._cables_ends = cables_ends
         self._diameter = diameter if diameter else DefaultValues.cable_diameter
+        self._pulleys = pulleys
+        self._elasticity = elasticity
 
     # get_fixed_point
     def get_fixed_point(self, source_vertex: BoxVertexEnum) -> Point:
@@ -114,6 +198,103 @@ class CableLayout:
         """Return a dict that maps source vertices to fixed points. TODO to property"""
         return {ce.source_vertex: ce.fixed_point for ce in self._cables_ends}
 
+    # diameter
+    @property
+    def diameter(self) -> float:
+        """Cables' diameter in mm."""
+        return self._diameter
+
+    # pulleys
+    @property
+    def pulleys(self) -> PulleyGeometry:
+        """Pulleys' model (None for ideal fixed points)."""
+        return self._pulleys
+
+    # elasticity
+    @property
+    def elasticity(self) -> CableElasticity:
+        """Cables' elasticity model (None for rigid cables)."""
+        return self._elasticity
+
+    # source_vertices
+    @property
+    def source_vertices(self) -> List[BoxVertexEnum]:
+        """Source vertices in the order used by the array methods (standard order, cf generate_cables)."""
+        return BoxVertexEnum.list_vertices()
+
+    # fixed_points_array
+    @property
+    def fixed_points_array(self) -> ndarray:
+        """(8, 3) array of the fixed points ordered as source_vertices."""
+        return np.array([self.get_fixed_point(vertex).get_tuple() for vertex in self.source_vertices])
+
+    # get_source_points
+    def get_source_points(self, poses: PoseBatch, dimensions: BoxDimensions) -> ndarray:
+        """(N, 8, 3) array of the source's vertices (where the cables are attached) for a batch of poses."""
+        # the vertices array is already in the standard order
+        return poses.transform(dimensions.get_vertices_array())
+
+    # get_lengths
+    def get_lengths(self, poses: PoseBatch, dimensions: BoxDimensions) -> ndarray:
+        """Inverse kinematics: (N, 8) array of cable lengths (mm) for a batch of poses."""
+        vectors = self.get_source_points(poses, dimensions) - self.fixed_points_array
+        return np.sqrt(np.sum(vectors * vectors, axis=-1))
+
+    # get_exit_points
+    def get_exit_points(self, poses: PoseBatch, dimensions: BoxDimensions) -> ndarray:
+        """(N, 8, 3) array of the points where the cables leave the room's side (pulleys' exits or fixed points)."""
+        fixed_points = self.fixed_points_array
+        if self._pulleys is None:
+            return np.broadcast_to(fixed_points, (len(poses),) + fixed_points.shape)
+        source_points = self.get_source_points(poses, dimensions)
+        return self._pulleys.get_lengths_and_exit_points(fixed_points, source_points)[1]
+
+    # get_corrected_lengths
+    def get_corrected_lengths(self, poses: PoseBatch, dimensions: BoxDimensions,
+                              tensions: ndarray = None) -> ndarray:
+        """
+        (N, 8) array of the cable lengths (mm) to command, with the optional pulleys and elasticity models.
+        Tensions (N, 8) in Newtons (ex: from the force distribution) are needed for the elasticity.
+        """
+        # geometry
+        if self._pulleys is None:
+            lengths = self.get_lengths(poses, dimensions)
+        else:
+            source_points = self.get_source_points(poses, dimensions)
+            lengths = self._pulleys.get_lengths_and_exit_points(self.fixed_points_array, source_points)[0]
+        # stretch
+        if self._elasticity is not None and tensions is not None:
+            lengths = self._elasticity.get_unstretched_lengths(lengths, tensions, diameter=self._diameter)
+        return lengths
+
+    # get_length_jacobians
+    def get_length_jacobians(self, poses: PoseBatch, dimensions: BoxDimensions) -> ndarray:
+        """
+        (N, 8, 6) array of the derivatives of the cable lengths with respect to (x, y, z, row, pitch, yaw).
+        The derivatives with respect to the angles are per radian.
+        """
+        vertices = dimensions.get_vertices_array()
+        vectors = poses.transform(vertices) - self.fixed_points_array
+        # unitary vectors fixed point -> source point (N, 8, 3)
+        directions = vectors / np.sqrt(np.sum(vectors * vectors, axis=-1))[..., np.newaxis]
+        # derivatives of the vertices' positions with respect to the angles (N, 3 angles, 8, 3)
+        derivatives = rotation_matrices_derivatives(poses.angles, order=poses.order, unity=poses.unity)
+        vertices_derivatives = np.einsum('nkij,pj->nkpi', derivatives, vertices)
+        # d length / d center = direction, d length / d angle = direction . d vertex / d angle
+        angles_jacobian = np.einsum('npi,nkpi->npk', directions, vertices_derivatives)
+        return np.concatenate([directions, angles_jacobian], axis=-1)
+
+    # get_forward_kinematics
+    def get_forward_kinematics(self, dimensions: BoxDimensions, **kwargs) -> ForwardKinematics:
+        """Forward kinematics solver (cable lengths -> source poses) for this layout. Cf ForwardKinematics."""
+        return ForwardKinematics(self, dimensions, **kwargs)
+
+    # forward_kinematics
+    def forward_kinematics(self, lengths: ndarray, dimensions: BoxDimensions,
+                           initial_poses: PoseBatch = None) -> PoseBatch:
+        """Source poses for a (N, 8) array of cable lengths (mm). Cf ForwardKinematics for the details."""
+        return self.get_forward_kinematics(dimensions).solve(lengths, initial_poses).poses
+
     @deprecated('use generate cables')
     def get_cables(self, source_points, diameter):
         pass
@@ -203,14 +384,11 @@ class Cable(AbsFollower):
         """Distance from the fixed point and the source point."""
         return self._vector.norm
 
-    # get_discretisation
-    def get_discretisation(self, nb_points: int = None,
-                           include_fixed_point=False, include_source_point=False):
-        """
-        Return an iterable of points that are along the cables' line
-        . TODO review method
-        :rtype Generator[Point]
-        """
+    # _discretisation_fractions
+    @staticmethod
+    def _discretisation_fractions(nb_points: int = None,
+                                  include_fixed_point=False, include_source_point=False) -> ndarray:
+        """Fractions (0 = fixed point, 1 = source point) where a cable is sampled by the discretisations."""
         # check nb_points
         if nb_points:
             assert type(nb_points) == int and nb_points > 0, "nb_points must be an int and > 0."
@@ -218,10 +396,46 @@ class Cable(AbsFollower):
         # include ends or not
         range_min = 0 if include_fixed_point else 1
         range_max = nb_points + (1 if include_source_point else 0)  # 1 pour compenser l'intervalle ouvert
-        # range
-        linear_range = range(range_min, range_max)
+        # one linspace for all the points
+        return np.arange(range_min, range_max) / nb_points
+
+    # discretise_many
+    @staticmethod
+    def discretise_many(fixed_points: ndarray, source_points: ndarray, nb_points: int = None,
+                        include_fixed_point=False, include_source_point=False) -> ndarray:
+        """
+        Discretise a batch of cables at once.
+        fixed_points and source_points are (..., 3) arrays (broadcastable), the result is a (..., n, 3) array.
+        """
+        fixed_points = np.asarray(fixed_points, dtype=float)
+        source_points = np.asarray(source_points, dtype=float)
+        assert fixed_points.shape[-1] == 3 and source_points.shape[-1] == 3, 'points must be given as (..., 3) arrays.'
+        # fractions along the cables
+        fractions = Cable._discretisation_fractions(nb_points, include_fixed_point, include_source_point)
+        # outer product of the fractions and the vectors fixed point -> source point
+        vectors = source_points - fixed_points
+        return fixed_points[..., np.newaxis, :] + fractions[:, np.newaxis] * vectors[..., np.newaxis, :]
+
+    # get_discretisation_array
+    def get_discretisation_array(self, nb_points: int = None,
+                                 include_fixed_point=False, include_source_point=False) -> ndarray:
+        """Return a (n, 3) array of points along the cable's line (from the fixed point to the source point)."""
+        return Cable.discretise_many(self._fixed_point.get_tuple(), self._source_mobile_point.get_tuple(),
+                                     nb_points=nb_points,
+                                     include_fixed_point=include_fixed_point,
+                                     include_source_point=include_source_point)
+
+    # get_discretisation
+    def get_discretisation(self, nb_points: int = None,
+                           include_fixed_point=False, include_source_point=False):
+        """
+        Return an iterable of points that are along the cables' line.
+        Prefer get_discretisation_array, this one creates a Point per sample.
+        :rtype Generator[Point]
+        """
+        array = self.get_discretisation_array(nb_points, include_fixed_point, include_source_point)
         # ret the generator
-        return (self.fixed_point + (i / nb_points) * self._vector for i in linear_range)
+        return (Point(*xyz) for xyz in array)
 
     # intersects_cable
     def intersects_cable(self, cable2: 'Cable') -> bool:
@@ -273,11 +487,10 @@ class Cable(AbsFollower):
             assert type(nb_points) == int and nb_points > 0, "nb_points must be an int and > 0."
         nb_points = nb_points if nb_points else DefaultValues.cable_discretisation_nb_points_box_intersection
 
-        dicretisation = self.get_discretisation(nb_points=nb_points,
-                                                include_fixed_point=include_fixed_point,
-                                                include_source_point=include_source_point)
-        appartient = (box.is_in_box(point) for point in dicretisation)
-        return any(appartient)
+        dicretisation = self.get_discretisation_array(nb_points=nb_points,
+                                                      include_fixed_point=include_fixed_point,
+                                                      include_source_point=include_source_point)
+        return bool(box.are_in_box(dicretisation).any())
 
     # is_inside_box
     def is_inside_box(self, box: Box, ends_considered=False) -> bool:
@@ -296,11 +509,11 @@ class Cable(AbsFollower):
                               inclure_sommet_ancrage=False,
                               inclure_sommet_source=False):
 
-        generateur_points = self.get_discretisation(nb_points=nombre_points_discretisation,
-                                                    include_fixed_point=inclure_sommet_ancrage,
-                                                    include_source_point=inclure_sommet_source)
+        dicretisation = self.get_discretisation_array(nb_points=nombre_points_discretisation,
+                                                      include_fixed_point=inclure_sommet_ancrage,
+                                                      include_source_point=inclure_sommet_source)
 
-        return all(pave.is_in_box(point) for point in generateur_points)
+        return bool(pave.are_in_box(dicretisation).all())
 
     @deprecated
     def get_vecteur_unitaire(self):
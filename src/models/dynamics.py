@@ -0,0 +1,213 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+from typing import List, Tuple
+
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.tension import ForceDistribution, force_distribution, force_distribution_improved
+from src.models.wrench import WrenchModel
+
+
+# TrajectoryDerivatives
+class TrajectoryDerivatives:
+    """Velocities and accelerations along N poses, all (N, 3) and in the global frame."""
+
+    # from_poses
+    @staticmethod
+    def from_poses(poses: PoseBatch, times: ndarray) -> 'TrajectoryDerivatives':
+        """
+        Finite differences (np.gradient, second order inside) of sampled poses at the given times (s).
+        The angular velocity comes from the derivative of the rotation matrices: skew(omega) = dR/dt . R^T.
+        """
+        times = np.asarray(times, dtype=float)
+        assert times.shape == (len(poses),), 'There must be one time per pose.'
+        assert len(poses) >= 3, 'At least 3 poses are needed.'
+        assert np.all(np.diff(times) > 0), 'The times must be increasing.'
+        # linear
+        velocities = np.gradient(poses.centers, times, axis=0)
+        accelerations = np.gradient(velocities, times, axis=0)
+        # angular
+        rotations = poses.rotation_matrices
+        skews = np.matmul(np.gradient(rotations, times, axis=0), np.swapaxes(rotations, -1, -2))
+        # vee of the skew-symmetric part (removes the finite differences' error)
+        angular_velocities = np.stack([skews[:, 2, 1] - skews[:, 1, 2],
+                                       skews[:, 0, 2] - skews[:, 2, 0],
+                                       skews[:, 1, 0] - skews[:, 0, 1]], axis=1) / 2
+        angular_accelerations = np.gradient(angular_velocities, times, axis=0)
+        return TrajectoryDerivatives(velocities, accelerations, angular_velocities, angular_accelerations)
+
+    # init
+    def __init__(self, velocities: ndarray, accelerations: ndarray,
+                 angular_velocities: ndarray, angular_accelerations: ndarray):
+        """Velocities (mm/s) and accelerations (mm/s2) of the poses' centers, angular ones in rad/s and rad/s2."""
+        arrays = [np.array(a, dtype=float, ndmin=2) for a in (velocities, accelerations,
+                                                              angular_velocities, angular_accelerations)]
+        # validations
+        assert all(a.shape == arrays[0].shape and a.shape[1] == 3 for a in arrays), 'All the arrays must be (N, 3).'
+        assert all(np.all(isfinite(a)) for a in arrays), 'The derivatives must be finite.'
+        self._velocities, self._accelerations, self._angular_velocities, self._angular_accelerations = arrays
+
+    # len
+    def __len__(self):
+        return self._velocities.shape[0]
+
+    # velocities
+    @property
+    def velocities(self) -> ndarray:
+        """(N, 3) mm/s"""
+        return self._velocities
+
+    # accelerations
+    @property
+    def accelerations(self) -> ndarray:
+        """(N, 3) mm/s2"""
+        return self._accelerations
+
+    # angular_velocities
+    @property
+    def angular_velocities(self) -> ndarray:
+        """(N, 3) rad/s"""
+        return self._angular_velocities
+
+    # angular_accelerations
+    @property
+    def angular_accelerations(self) -> ndarray:
+        """(N, 3) rad/s2"""
+        return self._angular_accelerations
+
+
+# DynamicTensionComparison
+class DynamicTensionComparison:
+    """Static and dynamic force distributions along a trajectory of N poses."""
+
+    # init
+    def __init__(self, static: ForceDistribution, dynamic: ForceDistribution, tolerance: float):
+        """tolerance (N) under which a difference of peak tension is ignored."""
+        self._static = static
+        self._dynamic = dynamic
+        self._tolerance = tolerance
+
+    # static
+    @property
+    def static(self) -> ForceDistribution:
+        return self._static
+
+    # dynamic
+    @property
+    def dynamic(self) -> ForceDistribution:
+        return self._dynamic
+
+    # static_peaks
+    @property
+    def static_peaks(self) -> ndarray:
+        """(N,) biggest static tension of each pose (N)."""
+        return np.max(self._static.tensions, axis=-1)
+
+    # dynamic_peaks
+    @property
+    def dynamic_peaks(self) -> ndarray:
+        """(N,) biggest dynamic tension of each pose (N)."""
+        return np.max(self._dynamic.tensions, axis=-1)
+
+    # underestimated
+    @property
+    def underestimated(self) -> ndarray:
+        """(N,) whether the static peak tension is under the dynamic one (or only the static one is feasible)."""
+        with np.errstate(invalid='ignore'):
+            underestimated = self.dynamic_peaks > self.static_peaks + self._tolerance
+        return underestimated | (self._static.feasible & ~self._dynamic.feasible)
+
+    # segments
+    @property
+    def segments(self) -> List[Tuple[int, int]]:
+        """[start, stop) indices of the consecutive underestimated poses."""
+        flags = np.concatenate([[False], self.underestimated, [False]]).astype(int)
+        changes = np.flatnonzero(np.diff(flags))
+        return list(zip(changes[::2].tolist(), changes[1::2].tolist()))
+
+
+# DynamicWrenchModel
+class DynamicWrenchModel:
+    """
+    Wrench model with the inertial loads of the source (rigid body): the cables must balance
+    the static wrench minus (m . a_G, I . alpha + omega x I . omega).
+    Kinematics are in mm and s (cf TrajectoryDerivatives), the inertia in kg.m2, the wrenches in N and N.mm.
+    """
+
+    # box_inertia
+    @staticmethod
+    def box_inertia(mass: float, dimensions: BoxDimensions) -> ndarray:
+        """(3, 3) inertia (kg.m2) of a homogeneous box about its center, in its own frame (dimensions in mm)."""
+        length, width, height = dimensions.length / 1000, dimensions.width / 1000, dimensions.height / 1000
+        return mass / 12 * np.diag([width ** 2 + height ** 2, length ** 2 + height ** 2, length ** 2 + width ** 2])
+
+    # init
+    def __init__(self, wrench_model: WrenchModel, inertia: ndarray = None, dimensions: BoxDimensions = None):
+        """
+        inertia (3, 3) in kg.m2 about the center of mass, in the source's frame.
+        By default the one of a homogeneous box with the given dimensions.
+        """
+        assert inertia is not None or dimensions is not None, 'Give the inertia or the dimensions.'
+        inertia = np.asarray(inertia, dtype=float) if inertia is not None \
+            else self.box_inertia(wrench_model.mass, dimensions)
+        # validations
+        assert inertia.shape == (3, 3), 'inertia must be (3, 3).'
+        assert np.allclose(inertia, inertia.T), 'inertia must be symmetric.'
+        # assign attributes
+        self._wrench_model = wrench_model
+        self._inertia = inertia
+
+    # wrench_model
+    @property
+    def wrench_model(self) -> WrenchModel:
+        """Static model."""
+        return self._wrench_model
+
+    # inertia
+    @property
+    def inertia(self) -> ndarray:
+        """(3, 3) kg.m2 in the source's frame."""
+        return self._inertia
+
+    # get_inertial_wrenches
+    def get_inertial_wrenches(self, poses: PoseBatch, derivatives: TrajectoryDerivatives) -> ndarray:
+        """(N, 6) inertial wrenches (m . a_G in N, I . alpha + omega x I . omega in N.mm) in the global frame."""
+        assert len(derivatives) == len(poses), 'There must be one set of derivatives per pose.'
+        rotations = poses.rotation_matrices
+        omegas, alphas = derivatives.angular_velocities, derivatives.angular_accelerations
+        # acceleration of the center of mass (mm/s2): a + alpha x r + omega x (omega x r)
+        offsets = np.einsum('nij,j->ni', rotations, self._wrench_model.center_of_mass)
+        accelerations = derivatives.accelerations + np.cross(alphas, offsets) + \
+            np.cross(omegas, np.cross(omegas, offsets))
+        forces = self._wrench_model.mass * accelerations / 1000
+        # inertia in the global frame: R I R^T
+        inertias = np.matmul(np.matmul(rotations, self._inertia), np.swapaxes(rotations, -1, -2))
+        momenta = np.einsum('nij,nj->ni', inertias, omegas)
+        moments = (np.einsum('nij,nj->ni', inertias, alphas) + np.cross(omegas, momenta)) * 1000
+        return np.concatenate([forces, moments], axis=1)
+
+    # get_wrenches
+    def get_wrenches(self, poses: PoseBatch, derivatives: TrajectoryDerivatives,
+                     external_wrenches: ndarray = None) -> ndarray:
+        """(N, 6) wrenches the cables must balance (A^T . F + w = 0)."""
+        return self._wrench_model.get_wrenches(poses, external_wrenches) - \
+            self.get_inertial_wrenches(poses, derivatives)
+
+    # get_force_distribution
+    def get_force_distribution(self, poses: PoseBatch, derivatives: TrajectoryDerivatives,
+                               external_wrenches: ndarray = None, improved: bool = False) -> ForceDistribution:
+        """Closed-form cable tensions with the inertial loads."""
+        directions, moment_arms = self._wrench_model.get_directions_and_moment_arms(poses)
+        method = force_distribution_improved if improved else force_distribution
+        return method(directions, moment_arms, self.get_wrenches(poses, derivatives, external_wrenches),
+                      self._wrench_model.f_min, self._wrench_model.f_max)
+
+    # compare_with_static
+    def compare_with_static(self, poses: PoseBatch, times: ndarray, improved: bool = False,
+                            tolerance: float = 1e-6) -> DynamicTensionComparison:
+        """Static and dynamic tensions along poses sampled at the given times (s)."""
+        derivatives = TrajectoryDerivatives.from_poses(poses, times)
+        static = self._wrench_model.get_force_distribution(poses, improved=improved)
+        dynamic = self.get_force_distribution(poses, derivatives, improved=improved)
+        return DynamicTensionComparison(static, dynamic, tolerance)
@@ -0,0 +1,160 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+from typing import Iterable, Generator
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+
+
+# ForwardKinematicsResult
+class ForwardKinematicsResult:
+    """Poses found by the forward kinematics and how the solver got there (N poses, C cables)."""
+
+    # init
+    def __init__(self, poses: PoseBatch, residuals: ndarray, iterations: ndarray, converged: ndarray):
+        """Store the results."""
+        self._poses = poses
+        self._residuals = residuals
+        self._iterations = iterations
+        self._converged = converged
+
+    # poses
+    @property
+    def poses(self) -> PoseBatch:
+        """Poses of the source."""
+        return self._poses
+
+    # residuals
+    @property
+    def residuals(self) -> ndarray:
+        """(N, C) cable lengths of the poses minus the given lengths (mm)."""
+        return self._residuals
+
+    # iterations
+    @property
+    def iterations(self) -> ndarray:
+        """(N,) number of iterations needed by each pose."""
+        return self._iterations
+
+    # converged
+    @property
+    def converged(self) -> ndarray:
+        """(N,) whether all the residuals of a pose went under the tolerance."""
+        return self._converged
+
+
+# ForwardKinematics
+class ForwardKinematics:
+    """
+    Batched Levenberg-Marquardt solver for the forward kinematics (cable lengths -> source pose).
+    The cable layout must give get_lengths(poses, dimensions) and get_length_jacobians(poses, dimensions).
+    """
+
+    # init
+    def __init__(self, cable_layout, dimensions: BoxDimensions, tolerance: float = 1e-3,
+                 max_iterations: int = 100, damping: float = 1e-3,
+                 unity: AngleUnityEnum = AngleUnityEnum.degree):
+        """Tolerance in mm (on all the cables), unity of the angles in the returned poses."""
+        # validations
+        assert isfinite(tolerance) and tolerance > 0, f'invalid tolerance ({tolerance})'
+        assert type(max_iterations) == int and max_iterations > 0, 'max_iterations must be an int and > 0.'
+        assert isfinite(damping) and damping > 0, f'invalid damping ({damping})'
+        assert unity != AngleUnityEnum.unknown, f'The angle unity cannot be unknown.'
+        # assign attributes
+        self._cable_layout = cable_layout
+        self._dimensions = dimensions
+        self._tolerance = tolerance
+        self._max_iterations = max_iterations
+        self._damping = damping
+        self._unity = unity
+
+    # _to_poses
+    def _to_poses(self, q: ndarray) -> PoseBatch:
+        """(N, 6) array (x, y, z, row, pitch, yaw in radians) -> PoseBatch in radians."""
+        return PoseBatch(q[:, :3], q[:, 3:], unity=AngleUnityEnum.radian)
+
+    # _residuals
+    def _residuals(self, q: ndarray, lengths: ndarray) -> ndarray:
+        """Cable lengths of the poses minus the wanted lengths."""
+        return self._cable_layout.get_lengths(self._to_poses(q), self._dimensions) - lengths
+
+    # default_initial_poses
+    def default_initial_poses(self, n: int) -> PoseBatch:
+        """Centroid of the fixed points without rotation."""
+        centroid = self._cable_layout.fixed_points_array.mean(axis=0)
+        return PoseBatch(np.tile(centroid, (n, 1)), np.zeros((n, 3)), unity=self._unity)
+
+    # solve
+    def solve(self, lengths: ndarray, initial_poses: PoseBatch = None) -> ForwardKinematicsResult:
+        """Find the poses of a (N, C) array of cable lengths (mm), starting from the initial poses."""
+        lengths = np.array(lengths, dtype=float, ndmin=2)
+        n = lengths.shape[0]
+        initial_poses = initial_poses if initial_poses is not None else self.default_initial_poses(n)
+        assert len(initial_poses) == n, 'There must be one initial pose per length vector.'
+        # state (x, y, z, row, pitch, yaw) with the angles in radians
+        q = np.concatenate([initial_poses.centers, initial_poses.get_angles(AngleUnityEnum.radian)], axis=1)
+        residuals = self._residuals(q, lengths)
+        costs = np.sum(residuals ** 2, axis=1)
+        dampings = np.full(n, self._damping)
+        iterations = np.zeros(n, dtype=int)
+        converged = np.all(np.abs(residuals) < self._tolerance, axis=1)
+        # iterate only on the poses that did not converge yet
+        for _ in range(self._max_iterations):
+            active = np.flatnonzero(~converged)
+            if active.size == 0:
+                break
+            iterations[active] += 1
+            # normal equations (with Marquardt's scaling)
+            jacobians = self._cable_layout.get_length_jacobians(self._to_poses(q[active]), self._dimensions)
+            jtj = np.einsum('nci,ncj->nij', jacobians, jacobians)
+            jtr = np.einsum('nci,nc->ni', jacobians, residuals[active])
+            diagonals = np.einsum('nii->ni', jtj)
+            damped = jtj + (dampings[active, np.newaxis] * (diagonals + 1e-9))[:, :, np.newaxis] * np.eye(6)
+            steps = -np.linalg.solve(damped, jtr[..., np.newaxis])[..., 0]
+            # try the steps
+            candidates = q[active] + steps
+            candidates_residuals = self._residuals(candidates, lengths[active])
+            candidates_costs = np.sum(candidates_residuals ** 2, axis=1)
+            # accept the improvements (less damping) or reject (more damping)
+            better = candidates_costs < costs[active]
+            accepted = active[better]
+            q[accepted] = candidates[better]
+            residuals[accepted] = candidates_residuals[better]
+            costs[accepted] = candidates_costs[better]
+            dampings[active] = np.where(better, dampings[active] / 10, dampings[active] * 10)
+            # converged if all the cables are under the tolerance (or stuck: the step does not change anything)
+            stuck = np.max(np.abs(steps), axis=1) < 1e-12
+            converged[active] = np.all(np.abs(residuals[active]) < self._tolerance, axis=1) | stuck
+        # poses in the asked unity
+        angles = q[:, 3:] if self._unity == AngleUnityEnum.radian else np.degrees(q[:, 3:])
+        poses = PoseBatch(q[:, :3], angles, unity=self._unity)
+        converged = np.all(np.abs(residuals) < self._tolerance, axis=1)
+        return ForwardKinematicsResult(poses, residuals, iterations, converged)
+
+    # track
+    def track(self, lengths_stream: Iterable[ndarray], initial_pose: PoseBatch = None) \
+            -> Generator[ForwardKinematicsResult, None, None]:
+        """
+        Solve a stream of (n, C) blocks (or (C,) vectors) of consecutive cable lengths along a trajectory.
+        Each block is warm started from the previous solution, extrapolated with the lengths' jacobian.
+        """
+        last_pose, last_lengths = initial_pose, None
+        for lengths in lengths_stream:
+            lengths = np.array(lengths, dtype=float, ndmin=2)
+            # first block without previous solution
+            if last_pose is None:
+                initial_poses = None
+            else:
+                q = np.concatenate([last_pose.centers, last_pose.get_angles(AngleUnityEnum.radian)], axis=1)
+                # first order prediction: dq = J^+ dl
+                if last_lengths is None:
+                    last_lengths = self._cable_layout.get_lengths(last_pose, self._dimensions)[0]
+                jacobian = self._cable_layout.get_length_jacobians(last_pose, self._dimensions)[0]
+                predictions = q + (lengths - last_lengths).dot(np.linalg.pinv(jacobian).T)
+                initial_poses = self._to_poses(predictions)
+            result = self.solve(lengths, initial_poses)
+            # keep the last solution for the next block
+            last_pose, last_lengths = result.poses[-1:], lengths[-1]
+            yield result
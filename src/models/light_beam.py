@@ -0,0 +1,119 @@
+import numpy as np
+
+from typing import Tuple
+
+from numpy import ndarray, pi, isfinite
+
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout
+from src.toolbox.useful import segments_distances
+
+
+# _disc_area_below
+def _disc_area_below(x: ndarray, radius: float) -> ndarray:
+    """Area of the part of a disc (centered at 0) whose coordinate along an axis is <= x."""
+    x = np.clip(x, -radius, radius)
+    return radius ** 2 * (pi - np.arccos(x / radius)) + x * np.sqrt(radius ** 2 - x ** 2)
+
+
+# BeamObstruction
+class BeamObstruction:
+    """
+    Result of the cable/light beam interference test over a batch of N poses and C cables.
+    The shadow of a cable is approximated by a band of the cable's width crossing the beam's cross-section
+    at the closest distance between the cable and the beam's axis.
+    """
+
+    # init
+    def __init__(self, distances: ndarray, cable_lost_fractions: ndarray):
+        """Store the (N, C) arrays of distances (mm) and lost fractions of the beam."""
+        self._distances = distances
+        self._cable_lost_fractions = cable_lost_fractions
+
+    # distances
+    @property
+    def distances(self) -> ndarray:
+        """(N, C) closest distances between the cables and the beam's axis (mm)."""
+        return self._distances
+
+    # cable_lost_fractions
+    @property
+    def cable_lost_fractions(self) -> ndarray:
+        """(N, C) fraction of the beam's cross-section hidden by each cable."""
+        return self._cable_lost_fractions
+
+    # lost_fractions
+    @property
+    def lost_fractions(self) -> ndarray:
+        """(N,) fraction of the beam's cross-section lost in each pose (at most 1)."""
+        return np.minimum(self._cable_lost_fractions.sum(axis=-1), 1.)
+
+    # obstructed_cables
+    @property
+    def obstructed_cables(self) -> ndarray:
+        """(N, C) whether each cable crosses the beam."""
+        return self._cable_lost_fractions > 0
+
+    # obstructed
+    @property
+    def obstructed(self) -> ndarray:
+        """(N,) whether the poses lose part of the beam."""
+        return self.obstructed_cables.any(axis=-1)
+
+
+# get_light_beams
+def get_light_beams(poses: PoseBatch, source_dimensions: BoxDimensions) -> Tuple[ndarray, ndarray]:
+    """
+    Light centers and directions (norm = 1) for a batch of poses, both (N, 3).
+    Same definition as Source.light_center and Source.light_direction (middle of the face YZ with positive X).
+    """
+    # in the source's own reference frame
+    light_center = np.array([[source_dimensions.length / 2, 0., 0.]])
+    centers = poses.transform(light_center)[:, 0, :]
+    # the light goes along the source's own X axis
+    directions = poses.rotation_matrices[:, :, 0]
+    return centers, directions
+
+
+# get_beam_obstruction
+def get_beam_obstruction(cable_layout: CableLayout, poses: PoseBatch, source_dimensions: BoxDimensions,
+                         light_radius: float = None, beam_length: float = None, window_center: ndarray = None,
+                         cable_diameter: float = None) -> BeamObstruction:
+    """
+    Vectorized interference test between the cables (capsules) and the light beam (cylinder) over a batch of poses.
+    The beam goes from the light center up to the window's plane (window_center given) or along beam_length (mm).
+    The light radius is half the source's height by default (cf. Source).
+    """
+    # validations
+    assert (beam_length is None) != (window_center is None), 'Give either beam_length or window_center.'
+    if beam_length is not None:
+        assert isfinite(beam_length) and beam_length > 0, f'invalid beam_length ({beam_length})'
+    if light_radius:
+        assert isfinite(light_radius) and light_radius > 0, f'invalid light_radius ({light_radius})'
+    if cable_diameter:
+        assert isfinite(cable_diameter) and cable_diameter > 0, f'invalid cable_diameter ({cable_diameter})'
+    # ensure values
+    light_radius = light_radius if light_radius else source_dimensions.height / 2
+    cable_radius = (cable_diameter if cable_diameter else cable_layout.diameter) / 2
+    # beams' axis (N, 3)
+    light_centers, light_directions = get_light_beams(poses, source_dimensions)
+    if window_center is not None:
+        to_window = np.asarray(window_center, dtype=float) - light_centers
+        lengths = np.maximum(np.sum(to_window * light_directions, axis=-1), 0.)
+    else:
+        lengths = np.full(len(poses), float(beam_length))
+    beam_ends = light_centers + lengths[:, np.newaxis] * light_directions
+    # cables (N, C, 3)
+    fixed_points = cable_layout.fixed_points_array[np.newaxis, :, :]
+    source_points = cable_layout.get_source_points(poses, source_dimensions)
+    # closest distances between each cable and the beam's axis (N, C)
+    distances, _, _ = segments_distances(fixed_points, source_points,
+                                         light_centers[:, np.newaxis, :], beam_ends[:, np.newaxis, :])
+    # band of the cable's width across the beam's cross-section
+    hidden_area = _disc_area_below(distances + cable_radius, light_radius) - \
+        _disc_area_below(distances - cable_radius, light_radius)
+    cable_lost_fractions = hidden_area / (pi * light_radius ** 2)
+    # no beam at all -> nothing is lost
+    cable_lost_fractions[lengths <= 0] = 0.
+    return BeamObstruction(distances, cable_lost_fractions)
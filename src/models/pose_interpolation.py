@@ -0,0 +1,154 @@
+import numpy as np
+
+from numpy import ndarray
+from scipy.interpolate import CubicSpline
+
+from src.math_entities import PoseBatch, rotation_matrices_to_angles
+
+
+# _matrices_to_quaternions
+def _matrices_to_quaternions(matrices: ndarray) -> ndarray:
+    """(..., 3, 3) rotation matrices -> (..., 4) unit quaternions (w, x, y, z), through the biggest component."""
+    m = matrices
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    # the 4 components' squares (times 4), the biggest one gives a well conditioned division
+    squares = np.stack([1 + trace, 1 + 2 * m[..., 0, 0] - trace, 1 + 2 * m[..., 1, 1] - trace,
+                        1 + 2 * m[..., 2, 2] - trace], axis=-1)
+    # products of pairs of components (times 4)
+    wx, wy, wz = m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]
+    xy, xz, yz = m[..., 0, 1] + m[..., 1, 0], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 2] + m[..., 2, 1]
+    candidates = np.stack([
+        np.stack([squares[..., 0], wx, wy, wz], axis=-1),
+        np.stack([wx, squares[..., 1], xy, xz], axis=-1),
+        np.stack([wy, xy, squares[..., 2], yz], axis=-1),
+        np.stack([wz, xz, yz, squares[..., 3]], axis=-1),
+    ], axis=-2)
+    biggest = np.argmax(squares, axis=-1)
+    quaternions = np.take_along_axis(candidates, biggest[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    return quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+
+# _quaternions_to_matrices
+def _quaternions_to_matrices(quaternions: ndarray) -> ndarray:
+    """(..., 4) unit quaternions (w, x, y, z) -> (..., 3, 3) rotation matrices."""
+    w, x, y, z = np.moveaxis(quaternions, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+# PoseInterpolator
+class PoseInterpolator:
+    """
+    Continuous trajectory through N timed poses: cubic splines on the centers and SLERP (shortest arc,
+    constant angular velocity on each interval) on the orientations.
+    The coefficients are computed once, the evaluation is vectorized on any array of times.
+    Times out of [start, end] are clamped: the source stays at the first/last pose (with zero velocity).
+    """
+
+    # init
+    def __init__(self, times: ndarray, poses: PoseBatch, bc_type: str = 'natural'):
+        """Increasing times (s) of the poses, bc_type: boundary conditions of the splines (cf scipy's CubicSpline)."""
+        times = np.asarray(times, dtype=float)
+        # validations
+        assert times.shape == (len(poses),), 'There must be one time per pose.'
+        assert len(poses) >= 2, 'At least 2 poses are needed.'
+        assert np.all(np.diff(times) > 0), 'The times must be increasing.'
+        # assign attributes
+        self._times = times
+        self._order = poses.order
+        self._unity = poses.unity
+        self._splines = CubicSpline(times, poses.centers, axis=0, bc_type=bc_type)
+        # quaternions on the same hemisphere as their predecessor (shortest arcs)
+        quaternions = _matrices_to_quaternions(poses.rotation_matrices)
+        signs = np.where(np.sum(quaternions[1:] * quaternions[:-1], axis=-1) < 0, -1., 1.)
+        quaternions[1:] *= np.cumprod(signs)[:, np.newaxis]
+        self._quaternions = quaternions
+        # arcs' angles (half the rotation angles)
+        dots = np.clip(np.sum(quaternions[1:] * quaternions[:-1], axis=-1), -1., 1.)
+        self._arcs = np.arccos(dots)
+        # global angular velocity of each interval: axis of R_k+1 R_k^T times its angle / duration
+        relative = np.matmul(poses.rotation_matrices[1:], np.swapaxes(poses.rotation_matrices[:-1], -1, -2))
+        relative_quaternions = _matrices_to_quaternions(relative)
+        relative_quaternions *= np.where(relative_quaternions[:, :1] < 0, -1., 1.)
+        vectors = relative_quaternions[:, 1:]
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            axes = np.where(norms > 0, vectors / norms, 0.)
+        rotation_angles = 2 * np.arctan2(norms[:, 0], relative_quaternions[:, 0])
+        self._angular_velocities = axes * (rotation_angles / np.diff(times))[:, np.newaxis]
+
+    # start
+    @property
+    def start(self) -> float:
+        return float(self._times[0])
+
+    # end
+    @property
+    def end(self) -> float:
+        return float(self._times[-1])
+
+    # duration
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    # _clamp
+    def _clamp(self, times: ndarray):
+        """(clamped times, whether they were in [start, end])"""
+        times = np.array(times, dtype=float, ndmin=1)
+        inside = (times >= self._times[0]) & (times <= self._times[-1])
+        return np.clip(times, self._times[0], self._times[-1]), inside
+
+    # _get_intervals
+    def _get_intervals(self, times: ndarray) -> ndarray:
+        """Index k of the interval [t_k, t_k+1] of each (clamped) time."""
+        return np.clip(np.searchsorted(self._times, times, side='right') - 1, 0, self._times.size - 2)
+
+    # get_centers
+    def get_centers(self, times: ndarray) -> ndarray:
+        """(M, 3) centers (mm) at the times (s)."""
+        return self._splines(self._clamp(times)[0])
+
+    # get_velocities
+    def get_velocities(self, times: ndarray) -> ndarray:
+        """(M, 3) centers' velocities (mm/s)."""
+        times, inside = self._clamp(times)
+        return self._splines(times, 1) * inside[:, np.newaxis]
+
+    # get_accelerations
+    def get_accelerations(self, times: ndarray) -> ndarray:
+        """(M, 3) centers' accelerations (mm/s2)."""
+        times, inside = self._clamp(times)
+        return self._splines(times, 2) * inside[:, np.newaxis]
+
+    # get_angular_velocities
+    def get_angular_velocities(self, times: ndarray) -> ndarray:
+        """(M, 3) angular velocities (rad/s) in the global frame, constant on each interval."""
+        times, inside = self._clamp(times)
+        return self._angular_velocities[self._get_intervals(times)] * inside[:, np.newaxis]
+
+    # get_rotation_matrices
+    def get_rotation_matrices(self, times: ndarray) -> ndarray:
+        """(M, 3, 3) rotation matrices at the times (s)."""
+        times = self._clamp(times)[0]
+        intervals = self._get_intervals(times)
+        fractions = (times - self._times[intervals]) / (self._times[intervals + 1] - self._times[intervals])
+        arcs = self._arcs[intervals]
+        # slerp, linear (then normalized) for the tiny arcs
+        small = arcs < 1e-6
+        sines = np.where(small, 1., np.sin(arcs))
+        first = np.where(small, 1 - fractions, np.sin((1 - fractions) * arcs) / sines)
+        second = np.where(small, fractions, np.sin(fractions * arcs) / sines)
+        quaternions = first[:, np.newaxis] * self._quaternions[intervals] + \
+            second[:, np.newaxis] * self._quaternions[intervals + 1]
+        quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+        return _quaternions_to_matrices(quaternions)
+
+    # get_poses
+    def get_poses(self, times: ndarray) -> PoseBatch:
+        """Poses at the times (s), with the order and the unity of the interpolated poses."""
+        angles = rotation_matrices_to_angles(self.get_rotation_matrices(times), order=self._order, unity=self._unity)
+        return PoseBatch(self.get_centers(times), angles, order=self._order, unity=self._unity)
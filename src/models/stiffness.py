@@ -0,0 +1,142 @@
+import numpy as np
+
+from numpy import ndarray, isfinite, pi
+
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout, CableElasticity
+from src.models.dynamics import DynamicWrenchModel
+from src.models.wrench import WrenchModel
+
+
+# get_stiffness_matrices
+def get_stiffness_matrices(directions: ndarray, moment_arms: ndarray, lengths: ndarray, tensions: ndarray,
+                           axial_stiffnesses: ndarray) -> ndarray:
+    """
+    (..., 6, 6) stiffness matrices (SI: N/m, N/rad, N.m/rad) of the source for a batch of poses:
+    K = sum_i G_i^T (k_i u_i u_i^T + f_i / l_i (I - u_i u_i^T)) G_i - [[0, 0], [0, f_i [u_i]x [b_i]x]],
+    with G_i = [I, -[b_i]x] and k_i = EA / l_i. The last term comes from the moment arms turning with the source,
+    K is symmetric when the tensions balance a wrench without moment about the center of mass.
+    directions and moment_arms (mm) are (..., C, 3), lengths (mm) and tensions (N) (..., C),
+    axial_stiffnesses (EA, N) scalar or (C,).
+    """
+    directions = np.asarray(directions, dtype=float)
+    moment_arms = np.asarray(moment_arms, dtype=float) / 1000
+    lengths = np.asarray(lengths, dtype=float) / 1000
+    tensions = np.asarray(tensions, dtype=float)
+    # cables' 3x3 stiffness: axial + geometric (tension) parts
+    projections = directions[..., :, np.newaxis] * directions[..., np.newaxis, :]
+    axial = (np.asarray(axial_stiffnesses, dtype=float) / lengths)[..., np.newaxis, np.newaxis]
+    geometric = (tensions / lengths)[..., np.newaxis, np.newaxis]
+    cables = axial * projections + geometric * (np.eye(3) - projections)
+    # G_i (..., C, 3, 6): displacement of the attachment = dp + dtheta x b = dp - [b]x dtheta
+    skews = np.cross(moment_arms[..., np.newaxis, :], np.eye(3))
+    g = np.concatenate([np.broadcast_to(np.eye(3), skews.shape), skews], axis=-1)
+    stiffness_matrices = np.einsum('...cki,...ckl,...clj->...ij', g, cables, g)
+    # rotation of the moment arms: d(b x f u) = f [u]x [b]x dtheta (skews are -[b]x)
+    direction_skews = np.cross(directions[..., np.newaxis, :], np.eye(3))
+    stiffness_matrices[..., 3:, 3:] -= np.einsum('...c,...ckl,...clj->...kj', tensions, direction_skews, skews)
+    return stiffness_matrices
+
+
+# StiffnessAnalysis
+class StiffnessAnalysis:
+    """
+    Stiffness of the source over a batch of N poses, with its mass matrices (SI).
+    The frequencies and compliances use the symmetric part of the stiffness matrices (they are symmetric when the
+    tensions balance the static wrench, cf get_stiffness_matrices).
+    """
+
+    # init
+    def __init__(self, stiffness_matrices: ndarray, mass_matrices: ndarray):
+        """(N, 6, 6) stiffness and mass matrices."""
+        self._stiffness_matrices = stiffness_matrices
+        self._mass_matrices = mass_matrices
+        # poses with NaN (singular force distribution) are left NaN
+        valid = np.all(isfinite(stiffness_matrices), axis=(-2, -1))
+        stiffnesses = np.where(valid[:, np.newaxis, np.newaxis], stiffness_matrices, np.eye(6))
+        stiffnesses = (stiffnesses + np.swapaxes(stiffnesses, -1, -2)) / 2
+        eigen_values = np.linalg.eigvalsh(stiffnesses)
+        positive = valid & (eigen_values[:, 0] > eigen_values[:, -1] * 1e-12)
+        # generalized eigen problem K v = w^2 M v through the Cholesky factor of M
+        inverse_factors = np.linalg.inv(np.linalg.cholesky(mass_matrices))
+        reduced = np.matmul(np.matmul(inverse_factors, stiffnesses), np.swapaxes(inverse_factors, -1, -2))
+        squared_pulsations = np.linalg.eigvalsh(reduced)[:, 0]
+        self._lowest_frequencies = np.where(valid, np.sqrt(np.maximum(squared_pulsations, 0.)) / (2 * pi), np.nan)
+        # compliances: worst direction of C = K^-1 (blocks), infinite where K is not positive definite
+        compliances = np.linalg.inv(np.where(positive[:, np.newaxis, np.newaxis], stiffnesses, np.eye(6)))
+        self._translational_compliances = np.linalg.eigvalsh(compliances[:, :3, :3])[:, -1] * 1000
+        self._rotational_compliances = np.linalg.eigvalsh(compliances[:, 3:, 3:])[:, -1]
+        for array in (self._translational_compliances, self._rotational_compliances):
+            array[~positive] = np.inf
+            array[~valid] = np.nan
+
+    # stiffness_matrices
+    @property
+    def stiffness_matrices(self) -> ndarray:
+        """(N, 6, 6) in N/m, N/rad and N.m/rad (translations then rotations)."""
+        return self._stiffness_matrices
+
+    # lowest_frequencies
+    @property
+    def lowest_frequencies(self) -> ndarray:
+        """(N,) lowest natural frequency (Hz) of the source on its cables."""
+        return self._lowest_frequencies
+
+    # translational_compliances
+    @property
+    def translational_compliances(self) -> ndarray:
+        """(N,) biggest displacement (mm) of the center per N of force (worst direction), inf if not stiff."""
+        return self._translational_compliances
+
+    # rotational_compliances
+    @property
+    def rotational_compliances(self) -> ndarray:
+        """(N,) biggest rotation (rad) per N.m of moment (worst direction), inf if not stiff."""
+        return self._rotational_compliances
+
+
+# StiffnessModel
+class StiffnessModel:
+    """Stiffness of the source hanging from elastic cables, evaluated on batches of poses."""
+
+    # from_cable_layout
+    @staticmethod
+    def from_cable_layout(wrench_model: WrenchModel, cable_layout: CableLayout,
+                          dimensions: BoxDimensions) -> 'StiffnessModel':
+        """Layout's elasticity (default CableElasticity if none) and inertia of a homogeneous box."""
+        elasticity = cable_layout.elasticity if cable_layout.elasticity else CableElasticity()
+        return StiffnessModel(wrench_model, elasticity.get_axial_stiffness(cable_layout.diameter),
+                              DynamicWrenchModel.box_inertia(wrench_model.mass, dimensions))
+
+    # init
+    def __init__(self, wrench_model: WrenchModel, axial_stiffnesses: ndarray, inertia: ndarray):
+        """axial_stiffnesses (EA in N) scalar or (C,), inertia (3, 3) in kg.m2 about the center of mass."""
+        axial_stiffnesses = np.asarray(axial_stiffnesses, dtype=float)
+        inertia = np.asarray(inertia, dtype=float)
+        # validations
+        assert np.all(isfinite(axial_stiffnesses)) and np.all(axial_stiffnesses > 0), 'invalid axial stiffnesses'
+        assert inertia.shape == (3, 3), 'inertia must be (3, 3).'
+        # assign attributes
+        self._wrench_model = wrench_model
+        self._axial_stiffnesses = axial_stiffnesses
+        self._inertia = inertia
+
+    # get_mass_matrices
+    def get_mass_matrices(self, poses: PoseBatch) -> ndarray:
+        """(N, 6, 6) diag(m, m, m, R I R^T) in kg and kg.m2."""
+        rotations = poses.rotation_matrices
+        mass_matrices = np.zeros((len(poses), 6, 6))
+        mass_matrices[:, :3, :3] = self._wrench_model.mass * np.eye(3)
+        mass_matrices[:, 3:, 3:] = np.matmul(np.matmul(rotations, self._inertia), np.swapaxes(rotations, -1, -2))
+        return mass_matrices
+
+    # analyze
+    def analyze(self, poses: PoseBatch, tensions: ndarray = None, improved: bool = True) -> StiffnessAnalysis:
+        """Stiffness of the poses under the given (N, C) tensions (N), by default the closed-form ones."""
+        if tensions is None:
+            tensions = self._wrench_model.get_force_distribution(poses, improved=improved).tensions
+        directions, moment_arms = self._wrench_model.get_directions_and_moment_arms(poses)
+        stiffness_matrices = get_stiffness_matrices(directions, moment_arms, self._wrench_model.get_lengths(poses),
+                                                    tensions, self._axial_stiffnesses)
+        return StiffnessAnalysis(stiffness_matrices, self.get_mass_matrices(poses))
@@ -1,169 +1,288 @@
 import numpy as np
 
+from numpy import ndarray, isfinite
+from typing import Tuple
+
 from src.math_entities import *
 from src.models.cables import *
 
 
-def get_tension(cable0, cable1, cable2, cable3, cable4, cable5, cable6, cable7):
+# Levi-Civita symbol (cross products with einsum)
+_LEVI_CIVITA = np.zeros((3, 3, 3))
+_LEVI_CIVITA[0, 1, 2] = _LEVI_CIVITA[1, 2, 0] = _LEVI_CIVITA[2, 0, 1] = 1.
+_LEVI_CIVITA[0, 2, 1] = _LEVI_CIVITA[2, 1, 0] = _LEVI_CIVITA[1, 0, 2] = -1.
+
+
+# ForceDistribution
+class ForceDistribution:
+    """Cable tensions found by a force distribution method for a batch of poses (shape (...) of poses, C cables)."""
+
+    # init
+    def __init__(self, tensions: ndarray, regular: ndarray, f_min: ndarray, f_max: ndarray,
+                 iterations: ndarray = None, conditions: ndarray = None):
+        """
+        Store the tensions (NaN where the wrench matrix is singular), the limits, the number of solves
+        and the condition numbers of the wrench matrices.
+        """
+        self._tensions = tensions
+        self._regular = regular
+        self._f_min = f_min
+        self._f_max = f_max
+        self._iterations = iterations if iterations is not None else np.ones(regular.shape, dtype=int)
+        self._conditions = conditions
+
+    # tensions
+    @property
+    def tensions(self) -> ndarray:
+        """(..., C) cable tensions in Newtons (NaN for singular poses)."""
+        return self._tensions
+
+    # regular
+    @property
+    def regular(self) -> ndarray:
+        """(...) whether the wrench matrix has full rank (6)."""
+        return self._regular
+
+    # iterations
+    @property
+    def iterations(self) -> ndarray:
+        """(...) number of closed-form solves needed by each pose (always 1 for the plain closed form)."""
+        return self._iterations
+
+    # conditions
+    @property
+    def conditions(self) -> ndarray:
+        """
+        (...) condition numbers of the wrench matrices A^T (inf where singular), a dexterity metric:
+        the bigger it is, the closer the pose is to a singularity (None if the method did not compute them).
+        Forces (N) and moments (N.mm) are mixed, so it depends on the unity of the lengths.
+        """
+        return self._conditions
+
+    # feasible
+    @property
+    def feasible(self) -> ndarray:
+        """(...) whether the wrench matrix is regular and all the tensions are in [f_min, f_max]."""
+        with np.errstate(invalid='ignore'):
+            in_limits = np.all((self._tensions >= self._f_min) & (self._tensions <= self._f_max), axis=-1)
+        return self._regular & in_limits
+
+
+# get_wrench_matrices
+def get_wrench_matrices(directions: ndarray, moment_arms: ndarray) -> ndarray:
+    """
+    Transposed wrench matrices A^T (..., 6, C) with the columns (u, b x u).
+    directions: (..., C, 3) unitary vectors source -> fixed point, moment_arms: (..., C, 3) center of mass -> vertex.
+    """
+    moments = np.einsum('ijk,...cj,...ck->...ci', _LEVI_CIVITA, moment_arms, directions)
+    return np.swapaxes(np.concatenate([directions, moments], axis=-1), -1, -2)
+
+
+# get_pseudo_inverses
+def get_pseudo_inverses(matrices: ndarray) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    Pseudo-inverses (..., n, m), ranks (...) and condition numbers (...) of a batch of (..., m, n) matrices,
+    all from a single SVD per matrix. The condition number is inf for rank deficient (or non finite) matrices.
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    # non finite matrices (ex: zero length cables -> NaN directions) are replaced by zeros (rank 0)
+    finite = np.all(isfinite(matrices), axis=(-2, -1))
+    matrices = np.where(finite[..., np.newaxis, np.newaxis], matrices, 0.)
+    u, singular_values, v_t = np.linalg.svd(matrices, full_matrices=False)
+    # same tolerance as numpy's matrix_rank
+    tolerance = singular_values[..., :1] * max(matrices.shape[-2:]) * np.finfo(float).eps
+    significant = singular_values > tolerance
+    ranks = np.count_nonzero(significant, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverses = np.where(significant, 1 / singular_values, 0.)
+        conditions = np.where(ranks == min(matrices.shape[-2:]), singular_values[..., 0] / singular_values[..., -1],
+                              np.inf)
+    pseudo_inverses = np.matmul(np.swapaxes(v_t, -1, -2) * inverses[..., np.newaxis, :], np.swapaxes(u, -1, -2))
+    return pseudo_inverses, ranks, conditions
+
+
+# _closed_form
+def _closed_form(a_t: ndarray, wrench: ndarray, f_med: ndarray) -> Tuple[ndarray, ndarray, ndarray]:
+    """
+    F = f_med - A (A^T A)^-1 (w + A^T f_med) = f_med - (A^T)^+ (w + A^T f_med) for a batch of A^T (..., 6, C).
+    The SVD of A^T avoids forming A^T A, which squares the condition number.
+    Return the tensions (garbage where singular), whether A^T has full rank (6) and its condition number.
+    """
+    pseudo_inverses, ranks, conditions = get_pseudo_inverses(a_t)
+    rhs = wrench + np.einsum('...ic,...c->...i', a_t, f_med)
+    correction = np.einsum('...ci,...i->...c', pseudo_inverses, rhs)
+    return f_med - correction, ranks == 6, conditions
+
+
+# _prepare_force_distribution
+def _prepare_force_distribution(directions: ndarray, moment_arms: ndarray, wrench: ndarray,
+                                f_min: ndarray, f_max: ndarray) -> Tuple[ndarray, ndarray, ndarray, ndarray]:
+    """A^T (..., 6, C) and the wrench, f_min and f_max broadcasted to the batch's shape."""
+    a_t = get_wrench_matrices(np.asarray(directions, dtype=float), np.asarray(moment_arms, dtype=float))
+    n_cables = a_t.shape[-1]
+    f_min = np.broadcast_to(np.asarray(f_min, dtype=float), a_t.shape[:-2] + (n_cables,))
+    f_max = np.broadcast_to(np.asarray(f_max, dtype=float), a_t.shape[:-2] + (n_cables,))
+    wrench = np.broadcast_to(np.asarray(wrench, dtype=float), a_t.shape[:-2] + (6,))
+    return a_t, wrench, f_min, f_max
+
+
+# force_distribution
+def force_distribution(directions: ndarray, moment_arms: ndarray, wrench: ndarray,
+                       f_min: ndarray, f_max: ndarray) -> ForceDistribution:
+    """
+    Vectorized closed-form force distribution (same method as get_tension) for any batch shape (...).
+    directions and moment_arms are (..., C, 3), wrench is (6,) or (..., 6) (external forces and moments),
+    f_min and f_max are scalars, (C,) or (..., C).
+    Equilibrium equation: A^t . F + w = 0, f_min < Fi < f_max.
+    """
+    a_t, wrench, f_min, f_max = _prepare_force_distribution(directions, moment_arms, wrench, f_min, f_max)
+    tensions, regular, conditions = _closed_form(a_t, wrench, (f_min + f_max) / 2)
+    tensions[~regular] = np.nan
+    return ForceDistribution(tensions, regular, f_min, f_max, conditions=conditions)
+
+
+# force_distribution_improved
+def force_distribution_improved(directions: ndarray, moment_arms: ndarray, wrench: ndarray,
+                                f_min: ndarray, f_max: ndarray) -> ForceDistribution:
+    """
+    Improved closed-form force distribution (Pott et al.), same arguments as force_distribution.
+    While a tension is out of its limits, the cable with the biggest violation is set to the violated limit,
+    moved to the wrench side of the equilibrium and the closed form is solved again with the remaining cables.
+    It stops when all the tensions are in the limits (feasible), when only 6 free cables remain or
+    when the reduced wrench matrix is singular (unfeasible, the last tensions are kept).
+    """
+    a_t, wrench, f_min, f_max = _prepare_force_distribution(directions, moment_arms, wrench, f_min, f_max)
+    batch_shape, n_cables = a_t.shape[:-2], a_t.shape[-1]
+    # flat batch (M, ...) to work on the running poses only
+    a_t = a_t.reshape((-1, 6, n_cables))
+    wrench = wrench.reshape((-1, 6))
+    f_min_flat, f_max_flat = f_min.reshape((-1, n_cables)), f_max.reshape((-1, n_cables))
+    n = a_t.shape[0]
+    free = np.ones((n, n_cables), dtype=bool)
+    tensions = np.full((n, n_cables), np.nan)
+    iterations = np.zeros(n, dtype=int)
+    # first solve with all the cables
+    tensions[:], regular, conditions = _closed_form(a_t, wrench, (f_min_flat + f_max_flat) / 2)
+    tensions[~regular] = np.nan
+    iterations[:] = 1
+    running = regular.copy()
+    for _ in range(n_cables - 6):
+        # biggest violation among the free cables
+        violations = np.maximum(f_min_flat - tensions, tensions - f_max_flat)
+        violations = np.where(free, np.maximum(violations, 0.), 0.)
+        running &= np.any(violations > 0, axis=-1)
+        active = np.flatnonzero(running)
+        if active.size == 0:
+            break
+        # clamp the worst cable to its violated limit
+        worst = np.argmax(violations[active], axis=-1)
+        clamped = np.where(tensions[active, worst] < f_min_flat[active, worst],
+                           f_min_flat[active, worst], f_max_flat[active, worst])
+        tensions[active, worst] = clamped
+        free[active, worst] = False
+        # reduced system: the clamped cables go to the wrench side
+        active_free = free[active]
+        a_t_free = a_t[active] * active_free[:, np.newaxis, :]
+        reduced_wrench = wrench[active] + np.einsum('nic,nc->ni', a_t[active],
+                                                    np.where(active_free, 0., tensions[active]))
+        f_med = np.where(active_free, (f_min_flat[active] + f_max_flat[active]) / 2, 0.)
+        new_tensions, new_regular, _ = _closed_form(a_t_free, reduced_wrench, f_med)
+        iterations[active] += 1
+        # singular reduced system -> stop there
+        solved = active[new_regular]
+        tensions[solved] = np.where(free[solved], new_tensions[new_regular], tensions[solved])
+        running[active[~new_regular]] = False
+    return ForceDistribution(tensions.reshape(batch_shape + (n_cables,)), regular.reshape(batch_shape),
+                             f_min, f_max, iterations.reshape(batch_shape), conditions.reshape(batch_shape))
+
+
+def get_tension(cable0, cable1, cable2, cable3, cable4, cable5, cable6, cable7, centre_masse: Point):
     """
     Function to calculate the tension in each cable.
     Reference: "Closed-form force distribution for parallel wire robots",
     A. Pott, T. Bruckmann, and L. Mikelsons
 
     :param cable: Instances of the Cable class.
+    :param centre_masse: Source's center of mass (Point in the room).
 
     :return: F, a np.array containing 8 tension values (in Newtons).
     """
+    # imported here: wrench imports this module
+    from src.models.wrench import WrenchModel
 
-    # Source's mass and Earth's gravity
-    m = 50.0  # kg
-    g = 9.8  # m/s^2
-
-    f_min = np.array([cable0.tension_min,
-                      cable1.tension_min,
-                      cable2.tension_min,
-                      cable3.tension_min,
-                      cable4.tension_min,
-                      cable5.tension_min,
-                      cable6.tension_min,
-                      cable7.tension_min])
-
-    f_max = np.array([cable0.tension_max,
-                      cable1.tension_max,
-                      cable2.tension_max,
-                      cable3.tension_max,
-                      cable4.tension_max,
-                      cable5.tension_max,
-                      cable6.tension_max,
-                      cable7.tension_max])
-
-    # Equilibrium equation: A^t . F + w = 0, f_min < Fi < f_max, A^t = transpose(A)
-
-    # normalized cable vectors
-    u0 = cable0.direction_source_to_fixed
-    u1 = cable1.direction_source_to_fixed
-    u2 = cable2.direction_source_to_fixed
-    u3 = cable3.direction_source_to_fixed
-    u4 = cable4.direction_source_to_fixed
-    u5 = cable5.direction_source_to_fixed
-    u6 = cable6.direction_source_to_fixed
-    u7 = cable7.direction_source_to_fixed
-
-    # vectors from center of mass to source's vertex
-    b0 = cable0.source_point - centre_masse
-    b1 = cable1.source_point - centre_masse
-    b2 = cable2.source_point - centre_masse
-    b3 = cable3.source_point - centre_masse
-    b4 = cable4.source_point - centre_masse
-    b5 = cable5.source_point - centre_masse
-    b6 = cable6.source_point - centre_masse
-    b7 = cable7.source_point - centre_masse
-
-    #A = np.array([
-    #    [np.append(u0, np.cross(b0, u0))],
-    #    [np.append(u1, np.cross(b1, u1))],
-    #    [np.append(u2, np.cross(b2, u2))],
-    #    [np.append(u3, np.cross(b3, u3))],
-    #    [np.append(u4, np.cross(b4, u4))],
-    #    [np.append(u5, np.cross(b5, u5))],
-    #    [np.append(u6, np.cross(b6, u6))],
-    #    [np.append(u7, np.cross(b7, u7))]
-    #]).reshape(8, 6)
-
-    A = np.array([
-        [u0.x, u0.y, u0.z, b0.cross(u0).x, b0.cross(u0).y, b0.cross(u0).z],
-        [u1.x, u1.y, u1.z, b1.cross(u1).x, b1.cross(u1).y, b1.cross(u1).z],
-        [u2.x, u2.y, u2.z, b2.cross(u2).x, b2.cross(u2).y, b2.cross(u2).z],
-        [u3.x, u3.y, u3.z, b3.cross(u3).x, b3.cross(u3).y, b3.cross(u3).z],
-        [u4.x, u4.y, u4.z, b4.cross(u4).x, b4.cross(u4).y, b4.cross(u4).z],
-        [u5.x, u5.y, u5.z, b5.cross(u5).x, b5.cross(u5).y, b5.cross(u5).z],
-        [u6.x, u6.y, u6.z, b6.cross(u6).x, b6.cross(u6).y, b6.cross(u6).z],
-        [u7.x, u7.y, u7.z, b7.cross(u7).x, b7.cross(u7).y, b7.cross(u7).z]
-    ])
-
-    #
-    print(b0, u0, b0.cross(u0))
-
-    w = np.array([0, 0, -m * g, 0, 0, 0])
+    cables = [cable0, cable1, cable2, cable3, cable4, cable5, cable6, cable7]
+
+    # source's frame: not rotated, centered on the center of mass
+    centre = np.array(centre_masse.get_tuple())
+    fixed_points = np.array([cable.fixed_point.get_tuple() for cable in cables])
+    attachments = np.array([cable.source_point.get_tuple() for cable in cables]) - centre
+    wrench_model = WrenchModel(fixed_points, attachments,
+                               f_min=np.array([cable.tension_min for cable in cables]),
+                               f_max=np.array([cable.tension_max for cable in cables]))
 
     # algorithme retourne np.array[-1.,-1.,-1.,-1.,-1.,-1.,-1.,-1.] si la position n'appartient pas
     # au workspace de la chambre
 
-    if np.linalg.matrix_rank(A) < 6:
+    distribution = wrench_model.get_force_distribution(PoseBatch(centre, np.zeros(3)))
+
+    if not distribution.regular[0]:
         print("Wrench matrix not invertible")
         return -1*np.ones(8)
 
-    f_med = (f_min+f_max)/2
-
-    A_pseudo_transp = np.dot(A, np.linalg.inv(np.dot(np.transpose(A), A)))
-
-    F_v = - np.dot(A_pseudo_transp, w + np.dot(np.transpose(A), f_med))
-
-    F = f_med + F_v
-
-#    for i in range(8):
-#        if (F[i] < f_min[i] or F[i] > f_max[i]):
-#            print("Cable {} is not in the interval [f_min, f_max]".format(i))
-#            return -1 * np.ones(8)
-
-#    if (np.linalg.norm(F_v) > np.linalg.norm(f_med) / 2):
-#        print("Tension not feasible")
-#        return -1 * np.ones(8)
-
-    return F
-
-
-# TESTE:
-long = 1.0
-larg = 1.0
-haut = 1.0
-
-point_ancrage = [Point(0.0, 0.0, 5.0), Point(4.0, 0.0, 5.0),
-                 Point(4.0, 6.0, 5.0), Point(0.0, 6.0, 5.0)]
-
-centre_masse = Point(2.0, 3.0, 2.5)
-
-# sommet_source = [centre_masse + np.array([-long / 2, -larg / 2, -haut / 2]),
-#                 centre_masse + np.array([ long / 2, -larg / 2, -haut / 2]),
-#                 centre_masse + np.array([ long / 2,  larg / 2, -haut / 2]),
-#                 centre_masse + np.array([-long / 2,  larg / 2, -haut / 2]),
-#                 centre_masse + np.array([-long / 2, -larg / 2,  haut / 2]),
-#                 centre_masse + np.array([ long / 2, -larg / 2,  haut / 2]),
-#                 centre_masse + np.array([ long / 2,  larg / 2,  haut / 2]),
-#                 centre_masse + np.array([-long / 2,  larg / 2,  haut / 2])]
-
-sommet_source = [
-    MobilePoint(1.5, 2.5, 2.0),
-    MobilePoint(2.5, 2.5, 2.0),
-    MobilePoint(2.5, 3.5, 2.0),
-    MobilePoint(1.5, 3.5, 2.0),
-    MobilePoint(1.5, 2.5, 3.0),
-    MobilePoint(2.5, 2.5, 3.0),
-    MobilePoint(2.5, 3.5, 3.0),
-    MobilePoint(1.5, 3.5, 3.0),
-]
-
-cable0 = Cable(point_ancrage[0], sommet_source[4], BoxVertexEnum.v001, 1., 10., 100.)
-cable1 = Cable(point_ancrage[0], sommet_source[5], BoxVertexEnum.v101, 1., 10., 100.)
-cable2 = Cable(point_ancrage[1], sommet_source[5], BoxVertexEnum.v101, 1., 10., 100.)
-cable3 = Cable(point_ancrage[1], sommet_source[6], BoxVertexEnum.v111, 1., 10., 100.)
-cable4 = Cable(point_ancrage[2], sommet_source[6], BoxVertexEnum.v111, 1., 10., 100.)
-cable5 = Cable(point_ancrage[2], sommet_source[7], BoxVertexEnum.v011, 1., 10., 100.)
-cable6 = Cable(point_ancrage[3], sommet_source[7], BoxVertexEnum.v011, 1., 10., 100.)
-cable7 = Cable(point_ancrage[3], sommet_source[4], BoxVertexEnum.v001, 1., 10., 100.)
-
-
-
-F = get_tension(
-    cable0,
-    cable1,
-    cable2,
-    cable3,
-    cable4,
-    cable5,
-    cable6,
-    cable7,
-    )
-print(F)
-print('')
+    return distribution.tensions[0]
+
+
+if __name__ == '__main__':
+    # TESTE:
+    long = 1.0
+    larg = 1.0
+    haut = 1.0
+
+    point_ancrage = [Point(0.0, 0.0, 5.0), Point(4.0, 0.0, 5.0),
+                     Point(4.0, 6.0, 5.0), Point(0.0, 6.0, 5.0)]
+
+    centre_masse = Point(2.0, 3.0, 2.5)
+
+    # sommet_source = [centre_masse + np.array([-long / 2, -larg / 2, -haut / 2]),
+    #                 centre_masse + np.array([ long / 2, -larg / 2, -haut / 2]),
+    #                 centre_masse + np.array([ long / 2,  larg / 2, -haut / 2]),
+    #                 centre_masse + np.array([-long / 2,  larg / 2, -haut / 2]),
+    #                 centre_masse + np.array([-long / 2, -larg / 2,  haut / 2]),
+    #                 centre_masse + np.array([ long / 2, -larg / 2,  haut / 2]),
+    #                 centre_masse + np.array([ long / 2,  larg / 2,  haut / 2]),
+    #                 centre_masse + np.array([-long / 2,  larg / 2,  haut / 2])]
+
+    sommet_source = [
+        MobilePoint(1.5, 2.5, 2.0),
+        MobilePoint(2.5, 2.5, 2.0),
+        MobilePoint(2.5, 3.5, 2.0),
+        MobilePoint(1.5, 3.5, 2.0),
+        MobilePoint(1.5, 2.5, 3.0),
+        MobilePoint(2.5, 2.5, 3.0),
+        MobilePoint(2.5, 3.5, 3.0),
+        MobilePoint(1.5, 3.5, 3.0),
+    ]
+
+    cable0 = Cable(point_ancrage[0], sommet_source[4], BoxVertexEnum.v001, 1., 10., 100.)
+    cable1 = Cable(point_ancrage[0], sommet_source[5], BoxVertexEnum.v101, 1., 10., 100.)
+    cable2 = Cable(point_ancrage[1], sommet_source[5], BoxVertexEnum.v101, 1., 10., 100.)
+    cable3 = Cable(point_ancrage[1], sommet_source[6], BoxVertexEnum.v111, 1., 10., 100.)
+    cable4 = Cable(point_ancrage[2], sommet_source[6], BoxVertexEnum.v111, 1., 10., 100.)
+    cable5 = Cable(point_ancrage[2], sommet_source[7], BoxVertexEnum.v011, 1., 10., 100.)
+    cable6 = Cable(point_ancrage[3], sommet_source[7], BoxVertexEnum.v011, 1., 10., 100.)
+    cable7 = Cable(point_ancrage[3], sommet_source[4], BoxVertexEnum.v001, 1., 10., 100.)
+
+    F = get_tension(
+        cable0,
+        cable1,
+        cable2,
+        cable3,
+        cable4,
+        cable5,
+        cable6,
+        cable7,
+        centre_masse,
+        )
+    print(F)
+    print('')
 
@@ -0,0 +1,179 @@
+import os
+import pickle
+import numpy as np
+
+from collections import OrderedDict
+from numpy import ndarray, isfinite
+from typing import List, Tuple
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.tension import ForceDistribution
+from src.models.wrench import WrenchModel
+
+
+# TensionCache
+class TensionCache:
+    """
+    Memoization of force distributions (LRU, bounded size).
+    The key of a pose is (wrench model's key, method, rotation order, quantized center and angles), and the
+    tensions of a key are computed at its rounded pose (center and angles multiples of the resolutions): poses
+    closer than the resolutions share the same tensions, whatever their order in the batches.
+    It can be saved to (and loaded from) a pickle file between runs.
+    """
+
+    # init
+    def __init__(self, max_size: int = 100000, center_resolution: float = 1., angle_resolution: float = 0.1,
+                 path: str = None):
+        """
+        Resolutions in mm and degrees. If path is given and exists, the cache is loaded from it
+        (it is the default path of save).
+        """
+        # validations
+        assert type(max_size) == int and max_size > 0, 'max_size must be an int and > 0.'
+        assert isfinite(center_resolution) and center_resolution > 0, f'invalid resolution ({center_resolution})'
+        assert isfinite(angle_resolution) and angle_resolution > 0, f'invalid resolution ({angle_resolution})'
+        # assign attributes
+        self._max_size = max_size
+        self._center_resolution = center_resolution
+        self._angle_resolution = angle_resolution
+        self._path = path
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # len
+    def __len__(self):
+        return len(self._entries)
+
+    # hits
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    # misses
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    # evictions
+    @property
+    def evictions(self) -> int:
+        """Number of entries dropped because the cache was full."""
+        return self._evictions
+
+    # hit_rate
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the looked up poses that were found (0 if none was looked up)."""
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.
+
+    # clear
+    def clear(self):
+        """Drop all the entries and reset the statistics."""
+        self._entries.clear()
+        self._hits = self._misses = self._evictions = 0
+
+    # _quantize
+    def _quantize(self, poses: PoseBatch) -> ndarray:
+        """(N, 6) quantized centers and angles in degrees (numbers of resolutions)."""
+        centers = np.round(poses.centers / self._center_resolution).astype(np.int64)
+        angles = np.round(poses.get_angles(AngleUnityEnum.degree) / self._angle_resolution).astype(np.int64)
+        return np.concatenate([centers, angles], axis=1)
+
+    # _get_keys
+    @staticmethod
+    def _get_keys(wrench_model: WrenchModel, poses: PoseBatch, improved: bool, quantized: ndarray) -> List[Tuple]:
+        """Keys of the poses from their (N, 6) quantized centers and angles (cf _quantize)."""
+        prefix = (wrench_model.key, bool(improved), poses.order.value)
+        return [prefix + tuple(row) for row in quantized.tolist()]
+
+    # get_keys
+    def get_keys(self, wrench_model: WrenchModel, poses: PoseBatch, improved: bool = False) -> List[Tuple]:
+        """Keys of the poses (quantized centers and angles in degrees)."""
+        return self._get_keys(wrench_model, poses, improved, self._quantize(poses))
+
+    # _get_rounded_poses
+    def _get_rounded_poses(self, quantized: ndarray, poses: PoseBatch) -> PoseBatch:
+        """Poses of (M, 6) quantized centers and angles (cf _quantize), with the rotation order of the poses."""
+        return PoseBatch(quantized[:, :3] * self._center_resolution, quantized[:, 3:] * self._angle_resolution,
+                         order=poses.order, unity=AngleUnityEnum.degree)
+
+    # _put
+    def _put(self, key: Tuple, entry: Tuple):
+        """Insert (most recent) and evict the least recently used entries."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    # get_force_distribution
+    def get_force_distribution(self, wrench_model: WrenchModel, poses: PoseBatch,
+                               improved: bool = False) -> ForceDistribution:
+        """
+        Force distribution of the poses: cached entries plus one batched computation of the missing keys
+        (once per key, at the rounded pose, even if it appears several times in the batch).
+        """
+        quantized = self._quantize(poses)
+        keys = self._get_keys(wrench_model, poses, improved, quantized)
+        n, n_cables = len(poses), wrench_model.n_cables
+        tensions = np.empty((n, n_cables))
+        regular = np.empty(n, dtype=bool)
+        iterations = np.empty(n, dtype=int)
+        conditions = np.empty(n)
+        missing = []
+        for i, key in enumerate(keys):
+            entry = self._entries.get(key)
+            if entry is None:
+                missing.append(i)
+                continue
+            self._entries.move_to_end(key)
+            tensions[i], regular[i], iterations[i], conditions[i] = entry
+        self._hits += n - len(missing)
+        self._misses += len(missing)
+        if missing:
+            # first index of each missing key, then the index (among them) of each missing pose's key
+            firsts = {}
+            for i in missing:
+                firsts.setdefault(keys[i], i)
+            uniques = np.array(list(firsts.values()))
+            positions = {key: k for k, key in enumerate(firsts)}
+            computed = wrench_model.get_force_distribution(self._get_rounded_poses(quantized[uniques], poses),
+                                                           improved=improved)
+            for key, k in positions.items():
+                self._put(key, (computed.tensions[k].copy(), computed.regular[k], computed.iterations[k],
+                                computed.conditions[k]))
+            missing = np.array(missing)
+            sources = np.array([positions[keys[i]] for i in missing])
+            tensions[missing], regular[missing] = computed.tensions[sources], computed.regular[sources]
+            iterations[missing], conditions[missing] = computed.iterations[sources], computed.conditions[sources]
+        f_min = np.broadcast_to(wrench_model.f_min, (n, n_cables))
+        f_max = np.broadcast_to(wrench_model.f_max, (n, n_cables))
+        return ForceDistribution(tensions, regular, f_min, f_max, iterations, conditions)
+
+    # save
+    def save(self, path: str = None):
+        """Pickle the entries and the resolutions (to the init's path by default)."""
+        path = path if path else self._path
+        assert path, 'No path was given.'
+        with open(path, 'wb') as file:
+            pickle.dump({'center_resolution': self._center_resolution, 'angle_resolution': self._angle_resolution,
+                         'entries': list(self._entries.items())}, file)
+
+    # load
+    def load(self, path: str):
+        """Add the entries of a saved cache (with the same resolutions), they become the least recent ones."""
+        with open(path, 'rb') as file:
+            saved = pickle.load(file)
+        if (saved['center_resolution'], saved['angle_resolution']) != \
+                (self._center_resolution, self._angle_resolution):
+            raise Exception(f"The cache in '{path}' was saved with other resolutions.")
+        current = list(self._entries.items())
+        self._entries.clear()
+        for key, entry in saved['entries'] + current:
+            self._put(key, entry)
@@ -0,0 +1,168 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+from typing import Tuple
+from scipy.optimize import linprog, minimize
+
+from src.enums import TensionObjectiveEnum
+from src.math_entities import PoseBatch
+from src.models.tension import ForceDistribution, get_pseudo_inverses
+from src.configs import DefaultValues
+
+
+# TensionOptimizer
+class TensionOptimizer:
+    """
+    Optimal cable tensions in [f_min, f_max] satisfying the equilibrium A^T . F + w = 0 (C cables).
+    norm: minimal sum of squared tensions, solved by a primal-dual active set method on the tension bounds.
+    peak: minimal biggest tension (linear program), then the minimal norm among the tensions under that peak.
+    The active set (cables at their lower/upper limit) of a solution is the starting guess of the next one,
+    so along a feasible trajectory most samples are solved with a single linear solve (when the active set
+    does not change), an unfeasible sample leaves the guess unchanged.
+    SciPy's SLSQP is used as a fallback when the active set method does not settle.
+    """
+
+    # init
+    def __init__(self, f_min: ndarray = None, f_max: ndarray = None,
+                 objective: TensionObjectiveEnum = TensionObjectiveEnum.norm,
+                 max_iterations: int = 20, tolerance: float = 1e-6):
+        """f_min and f_max (N) are scalars or (C,), tolerance in N (bounds) and relative (equilibrium)."""
+        f_min = np.asarray(f_min if f_min is not None else DefaultValues.minimal_tention, dtype=float)
+        f_max = np.asarray(f_max if f_max is not None else DefaultValues.maximal_tention, dtype=float)
+        # validations
+        assert np.all(f_min <= f_max), 'f_min must be <= f_max.'
+        assert objective != TensionObjectiveEnum.unknown, 'The objective cannot be unknown.'
+        assert type(max_iterations) == int and max_iterations > 0, 'max_iterations must be an int and > 0.'
+        assert isfinite(tolerance) and tolerance > 0, f'invalid tolerance ({tolerance})'
+        # assign attributes
+        self._f_min = f_min
+        self._f_max = f_max
+        self._objective = objective
+        self._max_iterations = max_iterations
+        self._tolerance = tolerance
+
+    # objective
+    @property
+    def objective(self) -> TensionObjectiveEnum:
+        """Minimized criterion."""
+        return self._objective
+
+    # _is_solution
+    def _is_solution(self, a_t: ndarray, wrench: ndarray, tensions: ndarray, f_min: ndarray, f_max: ndarray) -> bool:
+        """Whether the tensions are in the limits and balance the wrench."""
+        equilibrium = np.max(np.abs(a_t.dot(tensions) + wrench)) <= self._tolerance * (1 + np.max(np.abs(wrench)))
+        in_limits = np.all(tensions >= f_min - self._tolerance) and np.all(tensions <= f_max + self._tolerance)
+        return bool(equilibrium and in_limits)
+
+    # _active_set_min_norm
+    def _active_set_min_norm(self, a_t: ndarray, wrench: ndarray, f_min: ndarray, f_max: ndarray,
+                             active_set: ndarray) -> Tuple[ndarray, ndarray, int, bool]:
+        """
+        Primal-dual active set method for min 1/2 |F|^2 (active_set: -1 at f_min, 0 free, +1 at f_max).
+        Return the tensions, the active set, the number of iterations and whether it converged.
+        """
+        tensions = np.zeros(a_t.shape[1])
+        iterations = 0
+        for iterations in range(1, self._max_iterations + 1):
+            free = active_set == 0
+            # cables at their limits go to the wrench side
+            tensions = np.where(active_set < 0, f_min, np.where(active_set > 0, f_max, 0.))
+            rhs = -wrench - a_t[:, ~free].dot(tensions[~free])
+            # minimal norm tensions of the free cables: F = (A_F^T)^+ rhs
+            pseudo_inverse = np.linalg.pinv(a_t[:, free])
+            tensions[free] = pseudo_inverse.dot(rhs)
+            if np.max(np.abs(a_t[:, free].dot(tensions[free]) - rhs)) > self._tolerance * (1 + np.max(np.abs(rhs))):
+                # the free cables cannot balance the wrench with this active set
+                return tensions, active_set, iterations, False
+            # multipliers: F_F + A_F lambda = 0 and gradient of the lagrangian for all the cables
+            multipliers = -pseudo_inverse.T.dot(tensions[free])
+            gradients = tensions + a_t.T.dot(multipliers)
+            gradients[free] = 0.
+            # new active set
+            trial = tensions - gradients
+            new_active_set = np.where(trial < f_min - self._tolerance, -1,
+                                      np.where(trial > f_max + self._tolerance, 1, 0))
+            if np.array_equal(new_active_set, active_set):
+                return tensions, active_set, iterations, True
+            active_set = new_active_set
+        return tensions, active_set, iterations, False
+
+    # _fallback_min_norm
+    def _fallback_min_norm(self, a_t: ndarray, wrench: ndarray, f_min: ndarray, f_max: ndarray,
+                           initial_tensions: ndarray) -> ndarray:
+        """SLSQP from the (clipped) given tensions."""
+        result = minimize(lambda f: f.dot(f) / 2, np.clip(initial_tensions, f_min, f_max), jac=lambda f: f,
+                          method='SLSQP', bounds=list(zip(f_min, f_max)),
+                          constraints=[{'type': 'eq', 'fun': lambda f: a_t.dot(f) + wrench, 'jac': lambda f: a_t}],
+                          options={'ftol': self._tolerance ** 2, 'maxiter': 200})
+        return result.x
+
+    # _min_peak
+    def _min_peak(self, a_t: ndarray, wrench: ndarray, f_min: ndarray, f_max: ndarray) -> float:
+        """Smallest achievable biggest tension (NaN if unfeasible): min t s.t. Fi <= t, A^T F = -w, bounds."""
+        n_cables = a_t.shape[1]
+        c = np.zeros(n_cables + 1)
+        c[-1] = 1.
+        a_ub = np.concatenate([np.eye(n_cables), -np.ones((n_cables, 1))], axis=1)
+        a_eq = np.concatenate([a_t, np.zeros((6, 1))], axis=1)
+        bounds = list(zip(f_min, f_max)) + [(None, None)]
+        result = linprog(c, A_ub=a_ub, b_ub=np.zeros(n_cables), A_eq=a_eq, b_eq=-wrench, bounds=bounds)
+        return result.x[-1] if result.status == 0 else np.nan
+
+    # solve
+    def solve(self, a_t: ndarray, wrench: ndarray, active_set: ndarray = None) \
+            -> Tuple[ndarray, ndarray, int]:
+        """
+        Optimal tensions of one pose: A^T (6, C) and wrench (6,), starting from the given active set (all free).
+        Return the tensions (NaN if unfeasible), the active set and the number of active set iterations.
+        """
+        n_cables = a_t.shape[1]
+        f_min = np.broadcast_to(self._f_min, (n_cables,))
+        f_max = np.broadcast_to(self._f_max, (n_cables,))
+        active_set = active_set if active_set is not None else np.zeros(n_cables, dtype=int)
+        # the peak objective lowers the upper limits to the optimal peak
+        if self._objective == TensionObjectiveEnum.peak:
+            peak = self._min_peak(a_t, wrench, f_min, f_max)
+            if np.isnan(peak):
+                return np.full(n_cables, np.nan), np.zeros(n_cables, dtype=int), 0
+            f_max = np.minimum(f_max, peak + self._tolerance)
+        tensions, active_set, iterations, converged = self._active_set_min_norm(a_t, wrench, f_min, f_max,
+                                                                                active_set)
+        if not (converged and self._is_solution(a_t, wrench, tensions, f_min, f_max)):
+            tensions = self._fallback_min_norm(a_t, wrench, f_min, f_max, tensions)
+            if not self._is_solution(a_t, wrench, tensions, f_min, f_max):
+                return np.full(n_cables, np.nan), np.zeros(n_cables, dtype=int), iterations
+            active_set = np.where(tensions <= f_min + self._tolerance, -1,
+                                  np.where(tensions >= f_max - self._tolerance, 1, 0))
+        return tensions, active_set, iterations
+
+    # solve_trajectory
+    def solve_trajectory(self, wrench_matrices: ndarray, wrenches: ndarray) -> ForceDistribution:
+        """
+        Optimal tensions of N consecutive poses: wrench_matrices (N, 6, C) (A^T) and wrenches (6,) or (N, 6).
+        Each pose is warm started with the active set of the last feasible one.
+        """
+        wrench_matrices = np.asarray(wrench_matrices, dtype=float)
+        n, _, n_cables = wrench_matrices.shape
+        wrenches = np.broadcast_to(np.asarray(wrenches, dtype=float), (n, 6))
+        tensions = np.full((n, n_cables), np.nan)
+        iterations = np.zeros(n, dtype=int)
+        # rank and condition number of the wrench matrices
+        _, ranks, conditions = get_pseudo_inverses(wrench_matrices)
+        regular = ranks == 6
+        active_set = None
+        for i in range(n):
+            if not regular[i]:
+                continue
+            tensions[i], new_active_set, iterations[i] = self.solve(wrench_matrices[i], wrenches[i], active_set)
+            if not np.isnan(tensions[i, 0]):
+                active_set = new_active_set
+        f_min = np.broadcast_to(self._f_min, (n, n_cables))
+        f_max = np.broadcast_to(self._f_max, (n, n_cables))
+        return ForceDistribution(tensions, regular, f_min, f_max, iterations, conditions)
+
+    # solve_poses
+    def solve_poses(self, wrench_model, poses: PoseBatch, external_wrenches: ndarray = None) -> ForceDistribution:
+        """Optimal tensions along consecutive poses of a WrenchModel (cf src.models.wrench)."""
+        return self.solve_trajectory(wrench_model.get_wrench_matrices(poses),
+                                     wrench_model.get_wrenches(poses, external_wrenches))
@@ -0,0 +1,163 @@
+import numpy as np
+
+from numpy import ndarray, isfinite
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout
+
+
+# TimeParameterization
+class TimeParameterization:
+    """
+    Timing of a path of N poses: instants (s) of the poses and the path's speed along the sample index s.
+    The cables' speeds and accelerations are the ones of the interpolated motion (constant s'' between samples).
+    """
+
+    # init
+    def __init__(self, times: ndarray, path_speeds: ndarray, path_accelerations: ndarray,
+                 length_derivatives: ndarray, length_second_derivatives: ndarray):
+        """(N,) times, s' and s'', (N, C) dl/ds and d2l/ds2."""
+        self._times = times
+        self._path_speeds = path_speeds
+        self._path_accelerations = path_accelerations
+        self._length_derivatives = length_derivatives
+        self._length_second_derivatives = length_second_derivatives
+
+    # len
+    def __len__(self):
+        return self._times.size
+
+    # times
+    @property
+    def times(self) -> ndarray:
+        """(N,) instants (s) of the poses, the first one is 0."""
+        return self._times
+
+    # duration
+    @property
+    def duration(self) -> float:
+        return float(self._times[-1])
+
+    # path_speeds
+    @property
+    def path_speeds(self) -> ndarray:
+        """(N,) s' (samples per second)."""
+        return self._path_speeds
+
+    # path_accelerations
+    @property
+    def path_accelerations(self) -> ndarray:
+        """(N,) s'' (samples per second2) on the segment starting at each pose (the last one ending at it)."""
+        return self._path_accelerations
+
+    # cable_speeds
+    @property
+    def cable_speeds(self) -> ndarray:
+        """(N, C) winding speeds (mm/s): dl/ds . s'"""
+        return self._length_derivatives * self._path_speeds[:, np.newaxis]
+
+    # cable_accelerations
+    @property
+    def cable_accelerations(self) -> ndarray:
+        """(N, C) winding accelerations (mm/s2): dl/ds . s'' + d2l/ds2 . s'^2"""
+        return self._length_derivatives * self._path_accelerations[:, np.newaxis] + \
+            self._length_second_derivatives * (self._path_speeds ** 2)[:, np.newaxis]
+
+
+# TimeOptimalParameterizer
+class TimeOptimalParameterizer:
+    """
+    Fastest timing of a geometric path of poses (rest to rest) under per-cable speed and acceleration limits.
+    The path is parameterized by the sample index s, the cable lengths' derivatives dl/ds come from the
+    batched length Jacobians (dl/ds = J . dq/ds) and d2l/ds2 from their finite differences.
+    With u = s'^2, the limits are |dl/ds| sqrt(u) <= v and |dl/ds . s'' + d2l/ds2 . u| <= a, and u is found by the
+    phase-plane method: maximal u curve, forward pass at maximal acceleration, backward pass at maximal deceleration.
+    The limits are enforced at the samples: the path must be sampled finely enough for the curvature.
+    """
+
+    # init
+    def __init__(self, cable_layout: CableLayout, dimensions: BoxDimensions, max_speeds: ndarray,
+                 max_accelerations: ndarray):
+        """max_speeds (mm/s) and max_accelerations (mm/s2) of the winches, scalars or (C,)."""
+        max_speeds = np.asarray(max_speeds, dtype=float)
+        max_accelerations = np.asarray(max_accelerations, dtype=float)
+        # validations
+        assert np.all(isfinite(max_speeds)) and np.all(max_speeds > 0), 'invalid max_speeds'
+        assert np.all(isfinite(max_accelerations)) and np.all(max_accelerations > 0), 'invalid max_accelerations'
+        # assign attributes
+        self._cable_layout = cable_layout
+        self._dimensions = dimensions
+        self._max_speeds = max_speeds
+        self._max_accelerations = max_accelerations
+
+    # get_length_derivatives
+    def get_length_derivatives(self, poses: PoseBatch):
+        """(N, C) dl/ds and d2l/ds2 (mm per sample) along the path."""
+        # dq/ds with the angles in radians, unwrapped so that a turn is not a jump
+        angles = np.unwrap(poses.get_angles(AngleUnityEnum.radian), axis=0)
+        path = np.concatenate([poses.centers, angles], axis=1)
+        path_derivatives = np.gradient(path, axis=0)
+        jacobians = self._cable_layout.get_length_jacobians(poses, self._dimensions)
+        length_derivatives = np.einsum('nck,nk->nc', jacobians, path_derivatives)
+        return length_derivatives, np.gradient(length_derivatives, axis=0)
+
+    # get_maximal_u
+    def get_maximal_u(self, length_derivatives: ndarray, length_second_derivatives: ndarray) -> ndarray:
+        """(N,) biggest u = s'^2 satisfying the speed limits and for which some s'' satisfies the accelerations'."""
+        d1, d2 = np.abs(length_derivatives), length_second_derivatives
+        widths, slopes, still = self._get_acceleration_bounds(length_derivatives, length_second_derivatives)
+        speeds = np.broadcast_to(self._max_speeds, d1.shape)
+        accelerations = np.broadcast_to(self._max_accelerations, d1.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u_max = np.min(np.where(still, np.inf, (speeds / d1) ** 2), axis=1)
+            # cables that do not move (dl/ds = 0): |d2l/ds2| u <= a
+            u_max = np.minimum(u_max, np.min(np.where(still & (d2 != 0), accelerations / np.abs(d2), np.inf), axis=1))
+            # s'' in [-w_i + c_i u, w_i + c_i u] for each moving cable: all the intervals must intersect
+            differences = slopes[:, :, np.newaxis] - slopes[:, np.newaxis, :]
+            pairs = np.where(differences > 0,
+                             (widths[:, :, np.newaxis] + widths[:, np.newaxis, :]) / differences, np.inf)
+        return np.minimum(u_max, np.min(pairs, axis=(1, 2)))
+
+    # _get_acceleration_bounds
+    def _get_acceleration_bounds(self, length_derivatives: ndarray, length_second_derivatives: ndarray):
+        """
+        (N, C) w and c such that the cable's acceleration limit is -w + c u <= s'' <= w + c u,
+        and the mask of the cables that do not move (no limit on s'', w = inf and c = 0).
+        """
+        d1 = length_derivatives
+        still = np.abs(d1) <= 1e-12 * (1 + np.max(np.abs(d1), axis=1, keepdims=True))
+        safe = np.where(still, 1., d1)
+        widths = np.where(still, np.inf, self._max_accelerations / np.abs(safe))
+        slopes = np.where(still, 0., -length_second_derivatives / safe)
+        return widths, slopes, still
+
+    # solve
+    def solve(self, poses: PoseBatch) -> TimeParameterization:
+        """Fastest timing of the poses, starting and ending at rest."""
+        assert len(poses) >= 3, 'At least 3 poses are needed.'
+        length_derivatives, length_second_derivatives = self.get_length_derivatives(poses)
+        u_max = self.get_maximal_u(length_derivatives, length_second_derivatives)
+        widths, slopes, _ = self._get_acceleration_bounds(length_derivatives, length_second_derivatives)
+        n = len(poses)
+        # forward: maximal acceleration from rest (ds = 1)
+        forward = np.empty(n)
+        forward[0] = 0.
+        for k in range(n - 1):
+            acceleration = np.min(widths[k] + slopes[k] * forward[k])
+            forward[k + 1] = min(u_max[k + 1], max(forward[k] + 2 * acceleration, 0.))
+        # backward: maximal deceleration down to rest
+        u = forward
+        u[-1] = 0.
+        for k in range(n - 2, -1, -1):
+            deceleration = np.max(-widths[k + 1] + slopes[k + 1] * u[k + 1])
+            u[k] = min(u[k], max(u[k + 1] - 2 * deceleration, 0.))
+        # instants: constant s'' on each segment
+        speeds = np.sqrt(u)
+        with np.errstate(divide='ignore'):
+            durations = 2 / (speeds[:-1] + speeds[1:])
+        times = np.concatenate([[0.], np.cumsum(durations)])
+        segment_accelerations = np.diff(u) / 2
+        path_accelerations = np.concatenate([segment_accelerations, segment_accelerations[-1:]])
+        return TimeParameterization(times, speeds, path_accelerations, length_derivatives, length_second_derivatives)
@@ -1,12 +1,150 @@
-from math import cos, sin, asin, pi
+from math import cos, sin, pi
 
-from src.enums import AngleUnityEnum, RotationOrderEnum
+import numpy as np
+
+from numpy import ndarray
+from typing import Tuple
+
+from src.enums import AngleUnityEnum, RotationOrderEnum, SunPositionBackendEnum
 from src.math_entities import SphericalCoordinates, Vec3, Orientation
-from src.toolbox.useful import x_sph, y_sph, z_sph, secondes_dans_horaire, point_azimut
+from src.toolbox.useful import secondes_dans_horaire
 from src.setups import parametres_objets
 from src.math_entities import *
 
 
+# number of days of the months (not a leap year)
+_MONTHS_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+# day_of_year
+def day_of_year(date: str, year: int = None) -> int:
+    """'dd/mm' -> number of the day in the year (1 for '01/01'), leap years are only considered if year is given."""
+    day, month = (int(value) for value in date.split('/'))
+    leap = year is not None and (year % 4 == 0 and year % 100 != 0 or year % 400 == 0)
+    assert 1 <= month <= 12, f"invalid month in '{date}'"
+    assert 1 <= day <= _MONTHS_DAYS[month - 1] + (leap and month == 2), f"invalid day in '{date}'"
+    return int(_MONTHS_DAYS[:month - 1].sum()) + day + (leap and month > 2)
+
+
+# parse_latitude
+def parse_latitude(latitude: str) -> float:
+    """'63.2/N' or '63.2/S' -> latitude in degrees (negative in the south)."""
+    value, hemisphere = latitude.split('/')
+    assert hemisphere in ('N', 'S'), f"invalid hemisphere in '{latitude}'"
+    return float(value) if hemisphere == 'N' else -float(value)
+
+
+# sun_positions
+def sun_positions(seconds: ndarray, days: ndarray, latitudes: ndarray) -> Tuple[ndarray, ndarray]:
+    """
+    Vectorized position of the sun seen by an observer on Earth (same model as Trajectory.position_soleil_secondes).
+    seconds since midnight (solar time), days of the year and latitudes (degrees) are broadcasted together.
+    Return the azimuths (degrees in [0, 360), clockwise from the north) and the altitudes (degrees).
+    """
+    seconds, days, latitudes = np.broadcast_arrays(np.asarray(seconds, dtype=float), np.asarray(days, dtype=float),
+                                                   np.radians(latitudes))
+    # declination (cosine approximation) and hour angle (0 at midnight)
+    declinations = -np.radians(23.45) * np.cos(2 * pi * (days + 10) / 365)
+    hour_angles = 2 * pi / (24 * 60 * 60) * seconds
+    # direction of the sun (x east, y north, z zenith)
+    x = np.cos(declinations) * np.sin(hour_angles)
+    y_equator = np.cos(declinations) * np.cos(hour_angles)
+    y = y_equator * np.sin(latitudes) + np.sin(declinations) * np.cos(latitudes)
+    z = -y_equator * np.cos(latitudes) + np.sin(declinations) * np.sin(latitudes)
+    azimuths = np.degrees(np.arctan2(x, y)) % 360
+    altitudes = np.degrees(np.arcsin(np.clip(z, -1., 1.)))
+    return azimuths, altitudes
+
+
+# Earth's mean radius and astronomical unit (km)
+_EARTH_MEAN_RADIUS = 6371.01
+_ASTRONOMICAL_UNIT = 149597890.
+
+
+# sun_positions_psa
+def sun_positions_psa(seconds: ndarray, days: ndarray, latitudes: ndarray, year: int, longitudes: ndarray = 0.,
+                      utc_offset: float = 0., refraction: bool = False) -> Tuple[ndarray, ndarray]:
+    """
+    Vectorized PSA algorithm (Blanco-Muriel et al., "Computing the solar vector", Solar Energy, 2001),
+    about 0.5 arc minute of accuracy around 2000 (NREL's SPA reaches 0.0003 degree for much more work).
+    seconds since midnight (local clock, utc_offset in hours), days of the year (1 for January 1st of year),
+    latitudes and longitudes (degrees, east positive) are broadcasted together.
+    The parallax is corrected, the atmospheric refraction only if refraction (Bennett's formula).
+    Return the azimuths (degrees in [0, 360), clockwise from the north) and the altitudes (degrees).
+    """
+    seconds, days, latitudes, longitudes = np.broadcast_arrays(
+        np.asarray(seconds, dtype=float), np.asarray(days, dtype=float),
+        np.radians(latitudes), np.asarray(longitudes, dtype=float))
+    hours = seconds / 3600 - utc_offset
+    # julian day of the 1st of January (0 h UT) and days since the 1st of January 2000 at 12 h UT
+    january_1st = (1461 * (year + 4799)) // 4 + 336 - (3 * ((year + 4899) // 100)) // 4 + 1 - 32075 - 0.5
+    n = january_1st + (days - 1) + hours / 24 - 2451545.
+    # ecliptic coordinates
+    omega = 2.1429 - 0.0010394594 * n
+    mean_longitudes = 4.8950630 + 0.017202791698 * n
+    mean_anomalies = 6.2400600 + 0.0172019699 * n
+    ecliptic_longitudes = mean_longitudes + 0.03341607 * np.sin(mean_anomalies) + \
+        0.00034894 * np.sin(2 * mean_anomalies) - 0.0001134 - 0.0000203 * np.sin(omega)
+    ecliptic_obliquities = 0.4090928 - 6.2140e-9 * n + 0.0000396 * np.cos(omega)
+    # celestial coordinates
+    right_ascensions = np.arctan2(np.cos(ecliptic_obliquities) * np.sin(ecliptic_longitudes),
+                                  np.cos(ecliptic_longitudes)) % (2 * pi)
+    declinations = np.arcsin(np.sin(ecliptic_obliquities) * np.sin(ecliptic_longitudes))
+    # local coordinates
+    greenwich_sidereal_times = 6.6974243242 + 0.0657098283 * n + hours
+    hour_angles = np.radians(greenwich_sidereal_times * 15 + longitudes) - right_ascensions
+    zeniths = np.arccos(np.clip(np.cos(latitudes) * np.cos(hour_angles) * np.cos(declinations) +
+                                np.sin(declinations) * np.sin(latitudes), -1., 1.))
+    azimuths = np.degrees(np.arctan2(-np.sin(hour_angles), np.tan(declinations) * np.cos(latitudes) -
+                                     np.sin(latitudes) * np.cos(hour_angles))) % 360
+    # parallax
+    zeniths = zeniths + _EARTH_MEAN_RADIUS / _ASTRONOMICAL_UNIT * np.sin(zeniths)
+    altitudes = 90. - np.degrees(zeniths)
+    if refraction:
+        # Bennett (arc minutes), negligible and ill-defined far under the horizon
+        corrections = 1 / np.tan(np.radians(altitudes + 7.31 / (altitudes + 4.4))) / 60
+        altitudes = np.where(altitudes > -1., altitudes + corrections, altitudes)
+    return azimuths, altitudes
+
+
+# fold_azimuths
+def fold_azimuths(azimuths: ndarray) -> ndarray:
+    """Azimuths in [0, 360) -> (-90, 90] (the opposite direction for the ones behind), cf Trajectory."""
+    azimuths = np.asarray(azimuths, dtype=float)
+    return np.where(azimuths > 270., azimuths - 360., np.where(azimuths > 90., azimuths - 180., azimuths))
+
+
+# translate_sun_angles
+def translate_sun_angles(azimuths: ndarray, altitudes: ndarray, R: float, H: float, L: float, W: float,
+                         alpha: float) -> Tuple[ndarray, ndarray]:
+    """
+    Vectorized TrajectoryTranslator.get_config: (...) azimuths and altitudes (degrees) ->
+    (..., 3) centers and (..., 3) angles (row, pitch, yaw) in radians of the source.
+    """
+    theta = np.radians(azimuths)
+    phi = np.radians(altitudes)
+    #reference: ask Mateus
+    centers = np.stack([L - R * np.cos(theta) * np.cos(phi),
+                        W / 2 + R * np.cos(theta) * np.sin(phi),
+                        alpha * H + R * np.sin(theta)], axis=-1)
+    angles = np.stack([np.zeros_like(theta), -theta, -phi], axis=-1)
+    return centers, angles
+
+
+class TrajectoryChunk:
+    """Block of consecutive samples of a (multi-day) trajectory, cf Trajectory.iter_chunks."""
+
+    def __init__(self, debut, jours, secondes, azimuts, altitudes):
+        self.debut = debut  # index of the first sample in the whole trajectory
+        self.jours = jours  # days of the year (can go over 365)
+        self.secondes = secondes  # seconds since midnight
+        self.azimuts = azimuts  # degrees
+        self.altitudes = altitudes  # degrees
+
+    def __len__(self):
+        return self.secondes.size
+
+
 class Trajectory:
     """
     :param date: String en format '29/07'
@@ -14,12 +152,16 @@ class Trajectory:
     :param heure: string en format '18:48'
     :param orientation_nord: float entre 0.0 et 360.0
     :param orientation_zenit: float entre 0.0 et 90.0
+    :param backend: algorithme de position du soleil (simple: temps solaire; psa: temps legal, cf sun_positions_psa)
+    :param annee, longitude, decalage_utc, refraction: seulement pour backend psa
     """
 
     # provavelmente é melhor tirar heure_initiale, heure_finale e intervalle do construtor
     # e coloca-los como parametro dos metodos
     def __init__(self, date, latitude, heure_initiale, heure_finale,
-                 intervalle, orientation_nord = 0.0, orientation_zenit=0.0):
+                 intervalle, orientation_nord = 0.0, orientation_zenit=0.0,
+                 backend=SunPositionBackendEnum.simple, annee=2018, longitude=0.0, decalage_utc=0.0,
+                 refraction=False):
         self.date = date
         self.latitude = latitude
         self.heure_initiale = heure_initiale
@@ -27,6 +169,15 @@ class Trajectory:
         self.intervalle = intervalle
         self.orientation_nord = orientation_nord
         self.orientation_zenit = orientation_zenit
+        self.backend = backend
+        self.annee = annee
+        self.longitude = longitude
+        self.decalage_utc = decalage_utc
+        self.refraction = refraction
+        assert backend != SunPositionBackendEnum.unknown, 'The backend cannot be unknown.'
+        # parsed once
+        self.jour = day_of_year(date, annee if backend == SunPositionBackendEnum.psa else None)
+        self.latitude_degres = parse_latitude(latitude)
 
     # coord spheriques prenant y comme nord
     '''
@@ -38,69 +189,56 @@ class Trajectory:
         return self.position_soleil_secondes(secs)
 
     def position_soleil_secondes(self, secs):
-        dic_mois = \
-             {
-                 '01': 31,
-                 '02': 28,
-                 '03': 31,
-                 '04': 30,
-                 '05': 31,
-                 '06': 30,
-                 '07': 31,
-                 '08': 31,
-                 '09': 30,
-                 '10': 31,
-                 '11': 30,
-                 '12': 31
-             }
-
-        # calcule le nombre n de jours dans la date (n=1 si date == '01/01')
-        n = int(self.date.split('/')[0])
-
-        for key in list(dic_mois.keys()):
-            if key != self.date.split('/')[1]:
-                n += dic_mois[key]
-            else:
-                break
-
-        # recuperer la valeur de latitude
-        if self.latitude.split('/')[1] == 'N':
-            lat = pi/180*float(self.latitude.split('/')[0])
-        else:
-            lat = -1*pi/180*float(self.latitude.split('/')[0])
-
-        # declin = angle de declinaison, calculé à partir de n
-        declin = -pi / 180 * 23.45 * cos(2 * pi * (n + 10) / 365)
-
-        # determiner la position [soleil_aizmut, soleil_altitude] du soleil:
-        w_terre = 2*pi/(24*60*60)  # en rad/seconde
+        soleil_azimut, soleil_altitude = self.get_positions_soleil(secs)
+        return [float(soleil_azimut), float(soleil_altitude)]
 
-        x = x_sph(declin, w_terre*secs)
-        y = y_sph(declin, w_terre*secs) * sin(lat) + z_sph(declin) * cos(lat)
-        z = -y_sph(declin, w_terre*secs) * cos(lat) + z_sph(declin) * sin(lat)
-
-        soleil_altitude = asin(z)*180/pi  # en degres
-        soleil_azimut = point_azimut(x, y)
+    def get_positions_soleil(self, secs, jours=None):
+        """
+        Vectorized position_soleil_secondes: arrays of seconds -> arrays of azimuths and altitudes (degrees).
+        jours: days of the year of the instants (the trajectory's date by default), they can go over 365.
+        """
+        jours = jours if jours is not None else self.jour
+        if self.backend == SunPositionBackendEnum.psa:
+            soleil_azimut, soleil_altitude = sun_positions_psa(secs, jours, self.latitude_degres, self.annee,
+                                                               self.longitude, self.decalage_utc, self.refraction)
+        else:
+            soleil_azimut, soleil_altitude = sun_positions(secs, jours, self.latitude_degres)
 
         # limiter l'intervalle de soleil_azimut entre -90 et 90
-
-        if soleil_azimut > 90.0 and soleil_azimut <= 270.0:
-            soleil_azimut -= 180.0
-        elif soleil_azimut > 270.0:
-            soleil_azimut -= 360.0
+        soleil_azimut = fold_azimuths(soleil_azimut)
 
         # !!!! hardcoded 180 degrees !!!!
         #return [soleil_azimut-self.orientation_nord + 180, soleil_altitude-self.orientation_zenit]
-        return [soleil_azimut - self.orientation_nord, soleil_altitude - self.orientation_zenit]
+        return soleil_azimut - self.orientation_nord, soleil_altitude - self.orientation_zenit
+
+    def get_secondes(self):
+        """Array of the trajectory's instants (seconds since midnight)."""
+        debut = secondes_dans_horaire(self.heure_initiale)
+        n_points = int((secondes_dans_horaire(self.heure_finale) - debut) / self.intervalle)
+        return debut + self.intervalle * np.arange(n_points)
+
+    def get_trajectory_arrays(self):
+        """(azimuths, altitudes) arrays of the whole trajectory."""
+        return self.get_positions_soleil(self.get_secondes())
 
     def get_trajectory(self):
-        points_trajectoire = []
+        return np.stack(self.get_trajectory_arrays(), axis=1).tolist()
 
-        n_points = int((secondes_dans_horaire(self.heure_finale)-secondes_dans_horaire(self.heure_initiale))/self.intervalle)
-        for i in range(n_points):
-            points_trajectoire.append(
-                self.position_soleil_secondes(secondes_dans_horaire(self.heure_initiale) + i * self.intervalle))
-        return points_trajectoire
+    def iter_chunks(self, taille_bloc, n_jours=1):
+        """
+        Lazily yield TrajectoryChunk's of at most taille_bloc consecutive samples over n_jours days
+        (the same hours every day, starting at the trajectory's date), with bounded memory.
+        """
+        assert type(taille_bloc) == int and taille_bloc > 0, 'taille_bloc must be an int and > 0.'
+        assert type(n_jours) == int and n_jours > 0, 'n_jours must be an int and > 0.'
+        secondes = self.get_secondes()
+        n_total = n_jours * secondes.size
+        for debut in range(0, n_total, taille_bloc):
+            indices = np.arange(debut, min(debut + taille_bloc, n_total))
+            jours = self.jour + indices // secondes.size
+            secs = secondes[indices % secondes.size]
+            azimuts, altitudes = self.get_positions_soleil(secs, jours)
+            yield TrajectoryChunk(debut, jours, secs, azimuts, altitudes)
 
     def get_configurations(self):
         lista_config = []
@@ -190,23 +328,41 @@ class TrajectoryTranslator:
 
         return (center, ypr_angles)
 
-    def get_config_list(self):
-        list_tuple_center_angles = []
-        for pair_theta_phi in self.traj.get_trajectory():
-            list_tuple_center_angles.append(self.get_config(pair_theta_phi))
+    def get_config_arrays(self, azimuts=None, altitudes=None):
+        """
+        Vectorized get_config over the whole trajectory (or the given sun angles, in degrees):
+        (N, 3) centers and (N, 3) angles (row, pitch, yaw) in radians.
+        """
+        if azimuts is None:
+            azimuts, altitudes = self.traj.get_trajectory_arrays()
+        return translate_sun_angles(azimuts, altitudes, self.R, self.H, self.L, self.W, self.alpha)
 
-        return list_tuple_center_angles
+    def get_poses(self, azimuts=None, altitudes=None):
+        """PoseBatch of get_config_arrays (angles in radians)."""
+        centers, angles = self.get_config_arrays(azimuts, altitudes)
+        return PoseBatch(centers, angles, unity=AngleUnityEnum.radian)
 
+    def iter_chunks(self, taille_bloc, n_jours=1):
+        """Lazily yield (TrajectoryChunk, PoseBatch) blocks of the trajectory, cf Trajectory.iter_chunks."""
+        for chunk in self.traj.iter_chunks(taille_bloc, n_jours):
+            yield chunk, self.get_poses(chunk.azimuts, chunk.altitudes)
 
+    def get_config_list(self):
+        """(Point, Orientation) of each instant, the orientations in radians (cf get_config_arrays)."""
+        centers, angles = self.get_config_arrays()
+        return [(Point(*center), Orientation(*ypr_angles, unity=AngleUnityEnum.radian))
+                for center, ypr_angles in zip(centers.tolist(), angles.tolist())]
 
 
-###### </TrajectoryTranslator> ######
 
-# test
-traj = Trajectory('03/03', '60.3/N', '10:00', '14:00', 2000)
-#print(traj.get_trajectory())
 
-trans = TrajectoryTranslator(traj, 20, 40, 80, 40, 0.5)
-print(trans.get_config_list())
-print(trans.get_config_list()[0][1])
+###### </TrajectoryTranslator> ######
+
+if __name__ == '__main__':
+    # test
+    traj = Trajectory('03/03', '60.3/N', '10:00', '14:00', 2000)
+    #print(traj.get_trajectory())
 
+    trans = TrajectoryTranslator(traj, 20, 40, 80, 40, 0.5)
+    print(trans.get_config_list())
+    print(trans.get_config_list()[0][1])
@@ -0,0 +1,182 @@
+import hashlib
+import numpy as np
+
+from numpy import ndarray, isfinite
+from typing import Tuple
+
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout
+from src.models.tension import ForceDistribution, force_distribution, force_distribution_improved, \
+    get_wrench_matrices
+from src.configs import DefaultValues
+
+
+# WrenchModel
+class WrenchModel:
+    """
+    Static wrench model of the source hanging from C cables, evaluated on batches of poses.
+    Lengths are in mm, forces in N and moments in N.mm (taken about the center of mass).
+    The pose-independent parts (attachments and moment arms in the source's frame, weight) are computed once.
+    """
+
+    # from_setup
+    @staticmethod
+    def from_setup(setup_source, cable_layout: CableLayout, external_wrench: ndarray = None,
+                   f_min: ndarray = None, f_max: ndarray = None) -> 'WrenchModel':
+        """Model of a setup's Source (cf src.setups.palaiseau.Source: mass, Dimensions, CenterOfMass)."""
+        dimensions = BoxDimensions(setup_source.Dimensions.length, setup_source.Dimensions.width,
+                                   setup_source.Dimensions.height)
+        center_of_mass = (setup_source.CenterOfMass.x, setup_source.CenterOfMass.y, setup_source.CenterOfMass.z)
+        return WrenchModel.from_cable_layout(cable_layout, dimensions, mass=setup_source.mass,
+                                             center_of_mass=center_of_mass, external_wrench=external_wrench,
+                                             f_min=f_min, f_max=f_max)
+
+    # from_cable_layout
+    @staticmethod
+    def from_cable_layout(cable_layout: CableLayout, dimensions: BoxDimensions, mass: float = None,
+                          center_of_mass: ndarray = None, external_wrench: ndarray = None,
+                          f_min: ndarray = None, f_max: ndarray = None) -> 'WrenchModel':
+        """Model of a box shaped source attached by its vertices (cf CableLayout.get_source_points)."""
+        return WrenchModel(cable_layout.fixed_points_array, dimensions.get_vertices_array(), mass=mass,
+                           center_of_mass=center_of_mass, external_wrench=external_wrench, f_min=f_min, f_max=f_max)
+
+    # init
+    def __init__(self, fixed_points: ndarray, attachments: ndarray, mass: float = None,
+                 center_of_mass: ndarray = None, external_wrench: ndarray = None,
+                 f_min: ndarray = None, f_max: ndarray = None, gravity: float = None):
+        """
+        fixed_points (C, 3) in the room, attachments (C, 3) and center_of_mass (3,) in the source's frame,
+        mass in kg, external_wrench (6,) in the room's frame (besides the weight), f_min and f_max (C,) or scalars,
+        gravity in m/s2.
+        """
+        fixed_points = np.array(fixed_points, dtype=float)
+        attachments = np.array(attachments, dtype=float)
+        center_of_mass = np.array(center_of_mass if center_of_mass is not None else (0., 0., 0.), dtype=float)
+        external_wrench = np.array(external_wrench if external_wrench is not None else np.zeros(6), dtype=float)
+        mass = mass if mass else DefaultValues.source_mass
+        gravity = gravity if gravity else DefaultValues.gravity
+        # validations
+        assert fixed_points.ndim == 2 and fixed_points.shape[1] == 3, 'fixed_points must be (C, 3).'
+        assert attachments.shape == fixed_points.shape, 'attachments must be (C, 3) like the fixed points.'
+        assert fixed_points.shape[0] >= 6, 'At least 6 cables are needed.'
+        assert center_of_mass.shape == (3,), 'center_of_mass must be (3,).'
+        assert external_wrench.shape == (6,), 'external_wrench must be (6,).'
+        assert isfinite(mass) and mass > 0, f'invalid mass ({mass})'
+        assert isfinite(gravity) and gravity > 0, f'invalid gravity ({gravity})'
+        n_cables = fixed_points.shape[0]
+        # assign attributes
+        self._fixed_points = fixed_points
+        self._attachments = attachments
+        self._center_of_mass = center_of_mass
+        self._mass = mass
+        self._gravity = gravity
+        self._f_min = np.broadcast_to(f_min if f_min is not None else DefaultValues.minimal_tention, (n_cables,))
+        self._f_max = np.broadcast_to(f_max if f_max is not None else DefaultValues.maximal_tention, (n_cables,))
+        # pose-independent parts
+        self._moment_arms_from_self_ref = attachments - center_of_mass
+        self._static_wrench = np.array([0., 0., -mass * gravity, 0., 0., 0.]) + external_wrench
+
+    # n_cables
+    @property
+    def n_cables(self) -> int:
+        """Number of cables (C)."""
+        return self._fixed_points.shape[0]
+
+    # mass
+    @property
+    def mass(self) -> float:
+        """Mass of the source in kg."""
+        return self._mass
+
+    # gravity
+    @property
+    def gravity(self) -> float:
+        """Gravity in m/s2."""
+        return self._gravity
+
+    # center_of_mass
+    @property
+    def center_of_mass(self) -> ndarray:
+        """(3,) center of mass in the source's frame (mm)."""
+        return self._center_of_mass
+
+    # fixed_points
+    @property
+    def fixed_points(self) -> ndarray:
+        """(C, 3) fixed points in the room (mm)."""
+        return self._fixed_points
+
+    # attachments
+    @property
+    def attachments(self) -> ndarray:
+        """(C, 3) attachment points in the source's frame (mm)."""
+        return self._attachments
+
+    # f_min
+    @property
+    def f_min(self) -> ndarray:
+        """(C,) minimal tensions (N)."""
+        return self._f_min
+
+    # f_max
+    @property
+    def f_max(self) -> ndarray:
+        """(C,) maximal tensions (N)."""
+        return self._f_max
+
+    # key
+    @property
+    def key(self) -> str:
+        """Hash of everything that changes the tensions (layout, source, limits), stable between runs."""
+        arrays = (self._fixed_points, self._attachments, self._center_of_mass, self._static_wrench,
+                  np.array([self._mass, self._gravity]), self._f_min, self._f_max)
+        digest = hashlib.sha1()
+        for array in arrays:
+            digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+        return digest.hexdigest()
+
+    # _get_cables_and_moment_arms
+    def _get_cables_and_moment_arms(self, poses: PoseBatch) -> Tuple[ndarray, ndarray]:
+        """(N, C, 3) vectors attachment -> fixed point and (N, C, 3) vectors center of mass -> attachment."""
+        rotations = poses.rotation_matrices
+        moment_arms = np.einsum('nij,cj->nci', rotations, self._moment_arms_from_self_ref)
+        # attachments in the room = center of mass + moment arm
+        centers_of_mass = poses.centers + np.einsum('nij,j->ni', rotations, self._center_of_mass)
+        return self._fixed_points - (centers_of_mass[:, np.newaxis, :] + moment_arms), moment_arms
+
+    # get_lengths
+    def get_lengths(self, poses: PoseBatch) -> ndarray:
+        """(N, C) straight cable lengths (mm)."""
+        vectors, _ = self._get_cables_and_moment_arms(poses)
+        return np.sqrt(np.sum(vectors * vectors, axis=-1))
+
+    # get_directions_and_moment_arms
+    def get_directions_and_moment_arms(self, poses: PoseBatch) -> Tuple[ndarray, ndarray]:
+        """(N, C, 3) unitary vectors source -> fixed point and (N, C, 3) vectors center of mass -> attachment."""
+        vectors, moment_arms = self._get_cables_and_moment_arms(poses)
+        with np.errstate(invalid='ignore'):
+            directions = vectors / np.sqrt(np.sum(vectors * vectors, axis=-1))[..., np.newaxis]
+        return directions, moment_arms
+
+    # get_wrench_matrices
+    def get_wrench_matrices(self, poses: PoseBatch) -> ndarray:
+        """(N, 6, C) transposed wrench matrices A^T."""
+        return get_wrench_matrices(*self.get_directions_and_moment_arms(poses))
+
+    # get_wrenches
+    def get_wrenches(self, poses: PoseBatch, external_wrenches: ndarray = None) -> ndarray:
+        """(N, 6) wrenches applied on the source (weight + model's external wrench + optional (N, 6) extra)."""
+        wrenches = np.tile(self._static_wrench, (len(poses), 1))
+        if external_wrenches is not None:
+            wrenches += external_wrenches
+        return wrenches
+
+    # get_force_distribution
+    def get_force_distribution(self, poses: PoseBatch, external_wrenches: ndarray = None,
+                               improved: bool = False) -> ForceDistribution:
+        """Closed-form cable tensions for a batch of poses (improved closed form with clamping if improved)."""
+        directions, moment_arms = self.get_directions_and_moment_arms(poses)
+        method = force_distribution_improved if improved else force_distribution
+        return method(directions, moment_arms, self.get_wrenches(poses, external_wrenches),
+                      self._f_min, self._f_max)
@@ -5,6 +5,9 @@ from src.enums import AngleUnityEnum
 
 class Source:
 
+    # mass
+    mass = 50.  # kg
+
     # dimensions
     class Dimensions:
         length = 800  # mm
@@ -12,7 +15,7 @@ class Source:
         height = 1600  # mm
 
     class CenterOfMass:
-        """Referenced from the source's center (XYZ with the same directions of the global frame)."""
+        """Referenced from the source's center, in the source's frame (XYZ rotating with the source, cf WrenchModel)."""
         x = 0
         y = 0
         z = 0
@@ -0,0 +1,173 @@
+import numpy as np
+
+from argparse import Namespace
+from multiprocessing import Pool
+from numpy import ndarray
+from typing import Dict, Tuple
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.trajectoire import sun_positions, fold_azimuths, translate_sun_angles
+from src.models.wrench import WrenchModel
+from src.simulation.field_tension_compromise.defaults import Constants as Const
+
+# one row per trajectory (cf evaluate_sun_grid)
+RESULTS_DTYPE = np.dtype([
+    ('latitude', float), ('orientation', float), ('day', int),
+    ('sunrise', float), ('sunset', float),
+    ('n_points', int), ('n_feasible', int), ('feasible', bool),
+    ('worst_tension', float), ('min_margin', float),
+])
+
+
+# SunGrid
+class SunGrid:
+    """
+    Sun trajectories of the 'sun' parameter: one per latitude, maisonette's orientation and day of the year,
+    each sampled with n_points instants during the daylight (simple model, cf sun_positions).
+    """
+
+    # from_namespace
+    @staticmethod
+    def from_namespace(ns: Namespace) -> 'SunGrid':
+        """Grid of the sun parser's arguments (n_days_year days spread over the year or the given days_year)."""
+        latitudes = np.linspace(ns.min_latitude, ns.max_latitude, ns.n_latitude)
+        orientations = np.linspace(ns.min_orientation, ns.max_orientation, ns.n_orientation)
+        if ns.days_year:
+            days = np.unique(ns.days_year)
+        else:
+            days = np.unique(np.round(np.linspace(Const.FIRST_DAY_YEAR, Const.LAST_DAY_YEAR, ns.n_days_year)))
+        return SunGrid(latitudes, orientations, days.astype(int), ns.n_points_trajectory)
+
+    # init
+    def __init__(self, latitudes: ndarray, orientations: ndarray, days: ndarray, n_points: int):
+        """Latitudes and orientations in degrees, days of the year (1 to 365)."""
+        self._latitudes = np.array(latitudes, dtype=float, ndmin=1)
+        self._orientations = np.array(orientations, dtype=float, ndmin=1)
+        self._days = np.array(days, dtype=int, ndmin=1)
+        # validations
+        assert np.all(np.abs(self._latitudes) <= 90), 'invalid latitudes'
+        assert np.all((self._days >= Const.FIRST_DAY_YEAR) & (self._days <= Const.LAST_DAY_YEAR)), 'invalid days'
+        assert type(n_points) == int and n_points >= Const.MIN_N_POINTS_TRAJECTORY, f'invalid n_points ({n_points})'
+        self._n_points = n_points
+
+    # shape
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """(n_latitudes, n_orientations, n_days)"""
+        return self._latitudes.size, self._orientations.size, self._days.size
+
+    # size
+    @property
+    def size(self) -> int:
+        """Number of trajectories."""
+        return int(np.prod(self.shape))
+
+    # n_points
+    @property
+    def n_points(self) -> int:
+        return self._n_points
+
+    # str
+    def __str__(self):
+        return f'{self.size} trajectories {self.shape} (latitudes, orientations, days) of {self._n_points} points'
+
+    # get_parameters
+    def get_parameters(self, start: int, stop: int) -> Tuple[ndarray, ndarray, ndarray]:
+        """Latitudes, orientations and days of the trajectories of flat (C order) indices [start, stop)."""
+        i, j, k = np.unravel_index(np.arange(start, stop), self.shape)
+        return self._latitudes[i], self._orientations[j], self._days[k]
+
+    # get_trajectories
+    def get_trajectories(self, start: int, stop: int) -> Dict[str, ndarray]:
+        """
+        Vectorized trajectories [start, stop): sunrise and sunset (T,) in seconds since midnight (solar time),
+        azimuths (folded, minus the orientation, cf Trajectory) and altitudes (T, n_points) in degrees.
+        The instants are the middles of n_points equal parts of the daylight, daylight (T, n_points) is False
+        for the points of the polar nights (sun under the horizon all day long).
+        """
+        latitudes, orientations, days = self.get_parameters(start, stop)
+        # sunrise: altitude 0, cos(hour angle) = tan(declination) tan(latitude) (hour angle 0 at midnight)
+        declinations = -np.radians(23.45) * np.cos(2 * np.pi * (days + 10) / 365)
+        cosines = np.clip(np.tan(declinations) * np.tan(np.radians(latitudes)), -1., 1.)
+        sunrises = np.arccos(cosines) * (24 * 60 * 60) / (2 * np.pi)
+        sunsets = 24 * 60 * 60 - sunrises
+        fractions = (np.arange(self._n_points) + 0.5) / self._n_points
+        seconds = sunrises[:, np.newaxis] + (sunsets - sunrises)[:, np.newaxis] * fractions
+        azimuths, altitudes = sun_positions(seconds, days[:, np.newaxis], latitudes[:, np.newaxis])
+        azimuths = fold_azimuths(azimuths) - orientations[:, np.newaxis]
+        return {'latitudes': latitudes, 'orientations': orientations, 'days': days,
+                'sunrises': sunrises, 'sunsets': sunsets, 'azimuths': azimuths, 'altitudes': altitudes,
+                'daylight': altitudes > 0}
+
+
+# state of the worker processes (set once by _init_worker)
+_worker = {}
+
+
+# _init_worker
+def _init_worker(grid: SunGrid, wrench_model: WrenchModel, translator: dict, improved: bool):
+    """Keep the grid and the robot's model once per process."""
+    _worker['grid'] = grid
+    _worker['wrench_model'] = wrench_model
+    _worker['translator'] = translator
+    _worker['improved'] = improved
+
+
+# _evaluate_chunk
+def _evaluate_chunk(bounds: Tuple[int, int]) -> Tuple[int, ndarray]:
+    """Rows (cf RESULTS_DTYPE) of the trajectories [start, stop), with start."""
+    start, stop = bounds
+    wrench_model = _worker['wrench_model']
+    trajectories = _worker['grid'].get_trajectories(start, stop)
+    daylight = trajectories['daylight']
+    # all the points of the chunk in a single batch
+    centers, angles = translate_sun_angles(trajectories['azimuths'], trajectories['altitudes'],
+                                           **_worker['translator'])
+    poses = PoseBatch(centers.reshape((-1, 3)), angles.reshape((-1, 3)), unity=AngleUnityEnum.radian)
+    distribution = wrench_model.get_force_distribution(poses, improved=_worker['improved'])
+    shape = daylight.shape + (wrench_model.n_cables,)
+    tensions = np.where(daylight[..., np.newaxis], distribution.tensions.reshape(shape), np.nan)
+    feasible = distribution.feasible.reshape(daylight.shape) & daylight
+    # aggregation per trajectory (over the daylight points with a regular force distribution)
+    rows = np.zeros(stop - start, dtype=RESULTS_DTYPE)
+    rows['latitude'], rows['orientation'], rows['day'] = \
+        trajectories['latitudes'], trajectories['orientations'], trajectories['days']
+    rows['sunrise'], rows['sunset'] = trajectories['sunrises'], trajectories['sunsets']
+    rows['n_points'] = np.count_nonzero(daylight, axis=1)
+    rows['n_feasible'] = np.count_nonzero(feasible, axis=1)
+    rows['feasible'] = (rows['n_feasible'] == rows['n_points']) & (rows['n_points'] > 0)
+    # fmax and fmin ignore the NaN (NaN only if all of them are)
+    margins = np.minimum(tensions - wrench_model.f_min, wrench_model.f_max - tensions)
+    rows['worst_tension'] = np.fmax.reduce(tensions.reshape((stop - start, -1)), axis=1)
+    rows['min_margin'] = np.fmin.reduce(margins.reshape((stop - start, -1)), axis=1)
+    return start, rows
+
+
+# evaluate_sun_grid
+def evaluate_sun_grid(grid: SunGrid, wrench_model: WrenchModel, translator: dict, n_processes: int = None,
+                      chunk_size: int = 100, improved: bool = True, path: str = None) -> ndarray:
+    """
+    Force distribution along all the trajectories of the grid, aggregated in a table (structured array,
+    cf RESULTS_DTYPE) of one row per trajectory (C order of the grid), saved at path (.npy) if given.
+    translator: parameters of translate_sun_angles (R, H, L, W, alpha, cf TrajectoryTranslator).
+    The trajectories are split in chunks of chunk_size shared by a pool of processes (a single process if
+    n_processes == 1), all the points of a chunk are evaluated in a single batch.
+    """
+    assert type(chunk_size) == int and chunk_size > 0, 'chunk_size must be an int and > 0.'
+    assert set(translator) == {'R', 'H', 'L', 'W', 'alpha'}, 'translator must give R, H, L, W and alpha.'
+    results = np.zeros(grid.size, dtype=RESULTS_DTYPE)
+    chunks = [(start, min(start + chunk_size, grid.size)) for start in range(0, grid.size, chunk_size)]
+    arguments = (grid, wrench_model, translator, improved)
+    if n_processes == 1:
+        _init_worker(*arguments)
+        for start, rows in map(_evaluate_chunk, chunks):
+            results[start:start + rows.size] = rows
+        _worker.clear()
+    else:
+        with Pool(n_processes, initializer=_init_worker, initargs=arguments) as pool:
+            for start, rows in pool.imap_unordered(_evaluate_chunk, chunks):
+                results[start:start + rows.size] = rows
+    if path:
+        np.save(path, results)
+    return results
@@ -0,0 +1,50 @@
+from src.setups import palaiseau
+
+
+# setup
+stp = palaiseau
+
+# ! everythin in mm ! ! everythin in mm ! ! everythin in mm ! ! everythin in mm ! ! everythin in mm !
+
+"""
+Robot evaluated along the sun grids of the 'sun' parameter (cf batch_evaluation.evaluate_sun_grid).
+The cable layout is the straight one of src.simulation.workspace.configs with X1 fixed.
+"""
+
+
+class Simulation:
+
+    # number of worker processes (None -> os.cpu_count())
+    n_processes = None
+
+    # number of trajectories evaluated at once by a worker
+    chunk_size = 100
+
+    # improved closed form (clamping of the saturated cables) instead of the plain one
+    improved = True
+
+    # where the tables ({alias}.npy) are written
+    output_dir = 'field_tension_compromise_results'
+
+
+class Translator:
+
+    # cf TrajectoryTranslator: the maisonette's center is at (L, W / 2, alpha * H)
+    R = 1500
+    H = 3700
+    L = 6500
+    W = 5000
+    alpha = 0.4
+
+
+class Layout:
+
+    # cf src.simulation.workspace.configs.Fixation
+    X1 = 7500.
+
+
+class Limits:
+
+    # tensions (N)
+    f_min = 10.
+    f_max = 1000.
@@ -18,6 +18,11 @@ sys.path.insert(0, parentdir)
 
 # project imports
 from src.simulation.field_tension_compromise.parsing import get_main_parser
+from src.models.boxes import BoxDimensions
+from src.models.wrench import WrenchModel
+from src.simulation.field_tension_compromise import configs as cfg
+from src.simulation.field_tension_compromise.batch_evaluation import SunGrid, evaluate_sun_grid
+from src.simulation.workspace.configs import get_cable_layout
 
 
 # main_parser
@@ -32,3 +37,23 @@ print(ns)
 # check if the command was given (error message if not)
 if not ns.command:
     main_parser.error('No command was passed. Call <<python run.py -h>> for help.')
+
+# sun trajectories (cf batch_evaluation.evaluate_sun_grid)
+if ns.command == 'create_parameter' and ns.parameter == 'sun':
+    grid = SunGrid.from_namespace(ns)
+    print(grid)
+    # robot (cf configs)
+    source = cfg.stp.Source
+    dimensions = BoxDimensions(source.Dimensions.length, source.Dimensions.width, source.Dimensions.height)
+    center_of_mass = (source.CenterOfMass.x, source.CenterOfMass.y, source.CenterOfMass.z)
+    wrench_model = WrenchModel.from_cable_layout(get_cable_layout(cfg.Layout.X1), dimensions, mass=source.mass,
+                                                 center_of_mass=center_of_mass,
+                                                 f_min=cfg.Limits.f_min, f_max=cfg.Limits.f_max)
+    translator = {'R': cfg.Translator.R, 'H': cfg.Translator.H, 'L': cfg.Translator.L, 'W': cfg.Translator.W,
+                  'alpha': cfg.Translator.alpha}
+    # compact table (one row per trajectory) under the alias
+    os.makedirs(cfg.Simulation.output_dir, exist_ok=True)
+    path = os.path.join(cfg.Simulation.output_dir, ns.alias + '.npy')
+    results = evaluate_sun_grid(grid, wrench_model, translator, n_processes=cfg.Simulation.n_processes,
+                                chunk_size=cfg.Simulation.chunk_size, improved=cfg.Simulation.improved, path=path)
+    print(f'{results["feasible"].sum()}/{results.size} feasible trajectories, written in {path}')
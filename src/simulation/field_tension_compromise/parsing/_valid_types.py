@@ -140,5 +140,14 @@ def valid_borned_float(name, min, max):
     return fun
 
 
+# valid alias (name of a parameter file)
 def valid_alias(s: str):
+    err_msg = f"Not a valid alias: {s}. "
+    err_msg += "It must be made of letters, digits, '-' and '_'."
 
+    # check characters
+    if not s or not all(c.isalnum() or c in '-_' for c in s):
+        # raise a arparser's exception
+        raise argparse.ArgumentTypeError(err_msg)
+
+    return s
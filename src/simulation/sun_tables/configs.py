@@ -0,0 +1,37 @@
+import numpy as np
+
+
+"""
+Precomputed sun trajectories (cf tables.py): every day of the year, for each latitude and maisonette orientation.
+The translation to the source's poses uses the same parameters as TrajectoryTranslator (R, H, L, W, alpha).
+"""
+
+
+class Simulation:
+
+    # where the tables (.npy files and index.json) are written
+    output_dir = 'sun_tables'
+
+
+class Grid:
+
+    # latitudes (degrees, negative in the south)
+    latitudes = np.arange(-60., 61., 10.)
+
+    # maisonette orientations (degrees from the north, cf Trajectory.orientation_nord)
+    orientations = np.arange(0., 181., 15.)
+
+    # instants of each day (seconds since midnight)
+    start = 0
+    end = 24 * 60 * 60
+    time_step = 600
+
+
+class Translator:
+
+    # cf TrajectoryTranslator
+    R = 20
+    H = 40
+    L = 80
+    W = 40
+    alpha = 0.5
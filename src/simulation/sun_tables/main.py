@@ -0,0 +1,23 @@
+import sys
+import time
+
+from src.simulation.sun_tables import configs as cfg
+from src.simulation.sun_tables.tables import build_sun_tables
+
+
+def main():
+    start = time.time()
+    tables = build_sun_tables(cfg.Simulation.output_dir, cfg.Grid.latitudes, cfg.Grid.orientations,
+                              cfg.Grid.time_step, cfg.Translator.R, cfg.Translator.H, cfg.Translator.L,
+                              cfg.Translator.W, cfg.Translator.alpha, start=cfg.Grid.start, end=cfg.Grid.end)
+    print(f'{time.time() - start:.1f} s')
+    print('tables', tables.azimuths.shape, 'written in', cfg.Simulation.output_dir)
+
+
+# main
+if __name__ == '__main__':
+    # arguments
+    args = sys.argv[1:]
+
+    # main call
+    main(*args)
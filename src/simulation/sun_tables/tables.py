@@ -0,0 +1,154 @@
+import os
+import json
+import numpy as np
+
+from numpy import ndarray
+from typing import Tuple
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.trajectoire import sun_positions, fold_azimuths, translate_sun_angles
+
+"""
+Layout of the tables in a directory (L latitudes, O orientations, D = 365 days, T instants per day):
+    azimuths.npy   (L, O, D, T)     degrees, folded in (-90, 90] minus the orientation (cf Trajectory)
+    altitudes.npy  (L, O, D, T)     degrees
+    centers.npy    (L, O, D, T, 3)  source's centers (cf TrajectoryTranslator)
+    angles.npy     (L, O, D, T, 3)  source's (row, pitch, yaw) in radians
+    index.json     latitudes, orientations, days, seconds and the translator's parameters
+"""
+
+# names of the arrays
+_ARRAYS = ('azimuths', 'altitudes', 'centers', 'angles')
+
+
+# build_sun_tables
+def build_sun_tables(output_dir: str, latitudes: ndarray, orientations: ndarray, time_step: float,
+                     R: float, H: float, L: float, W: float, alpha: float,
+                     start: float = 0., end: float = 24 * 60 * 60) -> 'SunTables':
+    """
+    Compute and write the tables of every day of the year, one latitude at a time (bounded memory).
+    Instants (seconds since midnight) in [start, end) every time_step.
+    """
+    latitudes = np.array(latitudes, dtype=float, ndmin=1)
+    orientations = np.array(orientations, dtype=float, ndmin=1)
+    seconds = np.arange(start, end, time_step, dtype=float)
+    days = np.arange(1, 366)
+    # validations
+    assert latitudes.ndim == 1 and np.all(np.abs(latitudes) <= 90), 'invalid latitudes'
+    assert orientations.ndim == 1, 'orientations must be a 1D array.'
+    assert seconds.size > 0, 'There must be at least one instant.'
+    # files
+    os.makedirs(output_dir, exist_ok=True)
+    shape = (latitudes.size, orientations.size, days.size, seconds.size)
+    arrays = {
+        name: np.lib.format.open_memmap(os.path.join(output_dir, name + '.npy'), mode='w+', dtype=float,
+                                        shape=shape + ((3,) if name in ('centers', 'angles') else ()))
+        for name in _ARRAYS
+    }
+    for i, latitude in enumerate(latitudes):
+        # (D, T) then the orientations
+        azimuths, altitudes = sun_positions(seconds[np.newaxis, :], days[:, np.newaxis], latitude)
+        azimuths = fold_azimuths(azimuths)[np.newaxis] - orientations[:, np.newaxis, np.newaxis]
+        altitudes = np.broadcast_to(altitudes, azimuths.shape)
+        centers, angles = translate_sun_angles(azimuths, altitudes, R, H, L, W, alpha)
+        arrays['azimuths'][i], arrays['altitudes'][i] = azimuths, altitudes
+        arrays['centers'][i], arrays['angles'][i] = centers, angles
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    # index
+    index = {
+        'latitudes': latitudes.tolist(), 'orientations': orientations.tolist(), 'days': days.tolist(),
+        'seconds': {'start': float(start), 'time_step': float(time_step), 'n': int(seconds.size)},
+        'translator': {'R': R, 'H': H, 'L': L, 'W': W, 'alpha': alpha},
+    }
+    with open(os.path.join(output_dir, 'index.json'), 'w') as file:
+        json.dump(index, file, indent=2)
+    return SunTables(output_dir)
+
+
+# SunTables
+class SunTables:
+    """Read only, memory-mapped access to tables written by build_sun_tables."""
+
+    # init
+    def __init__(self, directory: str):
+        """Open the index and map the arrays (nothing is read before slicing)."""
+        with open(os.path.join(directory, 'index.json')) as file:
+            self._index = json.load(file)
+        self._latitudes = np.array(self._index['latitudes'])
+        self._orientations = np.array(self._index['orientations'])
+        seconds = self._index['seconds']
+        self._seconds = seconds['start'] + seconds['time_step'] * np.arange(seconds['n'])
+        self._arrays = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in _ARRAYS}
+
+    # latitudes
+    @property
+    def latitudes(self) -> ndarray:
+        return self._latitudes
+
+    # orientations
+    @property
+    def orientations(self) -> ndarray:
+        return self._orientations
+
+    # seconds
+    @property
+    def seconds(self) -> ndarray:
+        """(T,) instants of each day (seconds since midnight)."""
+        return self._seconds
+
+    # translator
+    @property
+    def translator(self) -> dict:
+        """Parameters of the translation to the source's poses."""
+        return self._index['translator']
+
+    # azimuths
+    @property
+    def azimuths(self) -> ndarray:
+        """(L, O, D, T) memory-mapped array."""
+        return self._arrays['azimuths']
+
+    # altitudes
+    @property
+    def altitudes(self) -> ndarray:
+        """(L, O, D, T) memory-mapped array."""
+        return self._arrays['altitudes']
+
+    # centers
+    @property
+    def centers(self) -> ndarray:
+        """(L, O, D, T, 3) memory-mapped array."""
+        return self._arrays['centers']
+
+    # angles
+    @property
+    def angles(self) -> ndarray:
+        """(L, O, D, T, 3) memory-mapped array (radians)."""
+        return self._arrays['angles']
+
+    # get_indices
+    def get_indices(self, latitude: float, orientation: float, day: int) -> Tuple[int, int, int]:
+        """Indices of a latitude and an orientation of the tables and of a day of the year (1 to 365)."""
+        latitude_index = np.flatnonzero(np.isclose(self._latitudes, latitude))
+        orientation_index = np.flatnonzero(np.isclose(self._orientations, orientation))
+        if latitude_index.size == 0:
+            raise KeyError(f'The latitude {latitude} is not in the tables.')
+        if orientation_index.size == 0:
+            raise KeyError(f'The orientation {orientation} is not in the tables.')
+        assert 1 <= day <= 365, f'invalid day ({day})'
+        return int(latitude_index[0]), int(orientation_index[0]), day - 1
+
+    # get_sun_positions
+    def get_sun_positions(self, latitude: float, orientation: float, day: int) -> Tuple[ndarray, ndarray]:
+        """(T,) azimuths and altitudes of a day (views on the files)."""
+        indices = self.get_indices(latitude, orientation, day)
+        return self.azimuths[indices], self.altitudes[indices]
+
+    # get_poses
+    def get_poses(self, latitude: float, orientation: float, day: int) -> PoseBatch:
+        """Source's poses of a day."""
+        indices = self.get_indices(latitude, orientation, day)
+        return PoseBatch(self.centers[indices], self.angles[indices], unity=AngleUnityEnum.radian)
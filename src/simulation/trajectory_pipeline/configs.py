@@ -0,0 +1,77 @@
+import numpy as np
+
+from src.setups import palaiseau
+
+
+# setup
+stp = palaiseau
+
+# ! everythin in mm ! ! everythin in mm ! ! everythin in mm ! ! everythin in mm ! ! everythin in mm !
+
+"""
+Feasibility of the sun trajectories: sun -> pose -> IK -> collision (cables in the light beam) -> tension.
+The cable layout is the straight one of src.simulation.workspace.configs with X1 fixed.
+"""
+
+
+class Simulation:
+
+    # number of worker processes (None -> os.cpu_count())
+    n_processes = None
+
+    # number of samples per batch
+    batch_size = 20000
+
+    # number of consecutive days (from the trajectory's date)
+    n_days = 365
+
+    # improved closed form (clamping of the saturated cables) instead of the plain one
+    improved = True
+
+
+class Trajectory:
+
+    # cf src.models.trajectoire.Trajectory
+    date = '01/01'
+    latitude = '48.7/N'
+    heure_initiale = '04:00'
+    heure_finale = '22:00'
+    intervalle = 60  # s
+
+
+class Translator:
+
+    # cf TrajectoryTranslator: the maisonette's center is at (L, W / 2, alpha * H)
+    R = 1500
+    H = 3700
+    L = 6500
+    W = 5000
+    alpha = 0.4
+
+
+class Layout:
+
+    # cf src.simulation.workspace.configs.Fixation
+    X1 = 7500.
+
+
+class Limits:
+
+    # sun over the horizon (degrees)
+    min_altitude = 0.
+
+    # cables' lengths (mm)
+    min_length = 100.
+    max_length = 10000.
+
+    # fraction of the light beam hidden by the cables
+    max_lost_fraction = 0.
+
+    # tensions (N)
+    f_min = 10.
+    f_max = 1000.
+
+
+def get_window_center():
+    """The light beam goes up to the maisonette's center (the sphere's center of TrajectoryTranslator)."""
+    return np.array([Translator.L, Translator.W / 2, Translator.alpha * Translator.H])
@@ -0,0 +1,56 @@
+import sys
+import time
+
+from src.models.boxes import BoxDimensions
+from src.models.trajectoire import Trajectory, TrajectoryTranslator
+from src.models.wrench import WrenchModel
+from src.simulation.trajectory_pipeline import configs as cfg
+from src.simulation.trajectory_pipeline.pipeline import TrajectoryPipeline, get_time_batches
+from src.simulation.trajectory_pipeline.stages import SunStage, PoseStage, KinematicsStage, CollisionStage, \
+    TensionStage
+from src.simulation.workspace.configs import get_cable_layout
+
+
+def get_pipeline(trajectory: Trajectory) -> TrajectoryPipeline:
+    source = cfg.stp.Source
+    dimensions = BoxDimensions(source.Dimensions.length, source.Dimensions.width, source.Dimensions.height)
+    center_of_mass = (source.CenterOfMass.x, source.CenterOfMass.y, source.CenterOfMass.z)
+    cable_layout = get_cable_layout(cfg.Layout.X1)
+    translator = TrajectoryTranslator(trajectory, cfg.Translator.R, cfg.Translator.H, cfg.Translator.L,
+                                      cfg.Translator.W, cfg.Translator.alpha)
+    wrench_model = WrenchModel.from_cable_layout(cable_layout, dimensions, mass=source.mass,
+                                                 center_of_mass=center_of_mass,
+                                                 f_min=cfg.Limits.f_min, f_max=cfg.Limits.f_max)
+    return TrajectoryPipeline([
+        SunStage(trajectory, min_altitude=cfg.Limits.min_altitude),
+        PoseStage(translator),
+        KinematicsStage(cable_layout, dimensions, min_length=cfg.Limits.min_length,
+                        max_length=cfg.Limits.max_length),
+        CollisionStage(cable_layout, dimensions, max_lost_fraction=cfg.Limits.max_lost_fraction,
+                       window_center=cfg.get_window_center()),
+        TensionStage(wrench_model, improved=cfg.Simulation.improved),
+    ])
+
+
+def main():
+    trajectory = Trajectory(cfg.Trajectory.date, cfg.Trajectory.latitude, cfg.Trajectory.heure_initiale,
+                            cfg.Trajectory.heure_finale, cfg.Trajectory.intervalle)
+    pipeline = get_pipeline(trajectory)
+    batches = get_time_batches(trajectory, cfg.Simulation.batch_size, cfg.Simulation.n_days)
+
+    start = time.time()
+    survivors = pipeline.run(batches, n_processes=cfg.Simulation.n_processes)
+    print(f'{time.time() - start:.1f} s')
+
+    for statistics in pipeline.statistics:
+        print(statistics)
+    print(len(survivors.get('index', [])), 'feasible samples')
+
+
+# main
+if __name__ == '__main__':
+    # arguments
+    args = sys.argv[1:]
+
+    # main call
+    main(*args)
@@ -0,0 +1,168 @@
+import time
+import numpy as np
+
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Tuple
+
+from src.models.trajectoire import Trajectory
+from src.simulation.trajectory_pipeline.stages import Batch, Stage
+
+
+# StageStatistics
+class StageStatistics:
+    """Samples seen and kept by a stage, and the time it spent on them (summed over the processes)."""
+
+    # init
+    def __init__(self, name: str):
+        self._name = name
+        self._n_in = 0
+        self._n_out = 0
+        self._seconds = 0.
+
+    # name
+    @property
+    def name(self) -> str:
+        return self._name
+
+    # n_in
+    @property
+    def n_in(self) -> int:
+        return self._n_in
+
+    # n_out
+    @property
+    def n_out(self) -> int:
+        """Number of feasible samples given to the next stage."""
+        return self._n_out
+
+    # seconds
+    @property
+    def seconds(self) -> float:
+        return self._seconds
+
+    # throughput
+    @property
+    def throughput(self) -> float:
+        """Samples per second (of one process), 0 if the stage never ran."""
+        return self._n_in / self._seconds if self._seconds > 0 else 0.
+
+    # add
+    def add(self, n_in: int, n_out: int, seconds: float):
+        self._n_in += n_in
+        self._n_out += n_out
+        self._seconds += seconds
+
+    # str
+    def __str__(self):
+        return f'{self._name}: {self._n_out}/{self._n_in} kept, {self._seconds:.3f} s, ' \
+               f'{self.throughput:.0f} samples/s'
+
+
+# get_time_batches
+def get_time_batches(trajectory: Trajectory, batch_size: int, n_days: int = 1) -> Iterator[Batch]:
+    """
+    Lazily yield batches with the columns 'index' (of the sample), 'days' and 'seconds' of the trajectory's
+    instants over n_days days (the same hours every day, cf Trajectory.iter_chunks).
+    """
+    assert type(batch_size) == int and batch_size > 0, 'batch_size must be an int and > 0.'
+    assert type(n_days) == int and n_days > 0, 'n_days must be an int and > 0.'
+    seconds = trajectory.get_secondes()
+    n_total = n_days * seconds.size
+    for start in range(0, n_total, batch_size):
+        indices = np.arange(start, min(start + batch_size, n_total))
+        yield {'index': indices, 'days': trajectory.jour + indices // seconds.size,
+               'seconds': seconds[indices % seconds.size]}
+
+
+# TrajectoryPipeline
+class TrajectoryPipeline:
+    """
+    Chain of stages (ex: sun -> pose -> IK -> collision -> tension, cf stages.py) run on columnar batches.
+    The samples rejected by a stage are dropped, so the later (more expensive) stages only see the survivors.
+    """
+
+    # init
+    def __init__(self, stages: List[Stage]):
+        assert stages, 'There must be at least one stage.'
+        self._stages = list(stages)
+        self._statistics = [StageStatistics(stage.name) for stage in self._stages]
+
+    # stages
+    @property
+    def stages(self) -> List[Stage]:
+        return self._stages
+
+    # statistics
+    @property
+    def statistics(self) -> List[StageStatistics]:
+        """Per stage statistics of all the runs since the creation (or reset_statistics)."""
+        return self._statistics
+
+    # reset_statistics
+    def reset_statistics(self):
+        self._statistics = [StageStatistics(stage.name) for stage in self._stages]
+
+    # process_batch
+    def process_batch(self, batch: Batch) -> Tuple[Batch, List[Tuple[int, int, float]]]:
+        """
+        Survivors of a batch with all the columns, and (n_in, n_out, seconds) of each stage.
+        Once no sample is left, the next stages are skipped (and their columns are missing).
+        """
+        columns = dict(batch)
+        counts = []
+        for stage in self._stages:
+            n_in = len(next(iter(columns.values())))
+            if n_in == 0:
+                counts.append((0, 0, 0.))
+                continue
+            start = time.perf_counter()
+            new_columns, feasible = stage.process(columns)
+            columns.update(new_columns)
+            columns = {name: values[feasible] for name, values in columns.items()}
+            counts.append((n_in, int(np.count_nonzero(feasible)), time.perf_counter() - start))
+        return columns, counts
+
+    # iter_run
+    def iter_run(self, batches: Iterable[Batch], n_processes: int = 1) -> Iterator[Batch]:
+        """
+        Lazily yield the survivors of each batch (in order), the batches are processed by a pool of processes
+        unless n_processes == 1 (None -> os.cpu_count()).
+        """
+        if n_processes == 1:
+            results = (self.process_batch(batch) for batch in batches)
+            yield from self._record(results)
+        else:
+            with Pool(n_processes, initializer=_init_worker, initargs=(self,)) as pool:
+                yield from self._record(pool.imap(_process_batch, batches))
+
+    # _record
+    def _record(self, results: Iterable[Tuple[Batch, List[Tuple[int, int, float]]]]) -> Iterator[Batch]:
+        """Add the counts to the statistics and yield the survivors."""
+        for columns, counts in results:
+            for statistics, count in zip(self._statistics, counts):
+                statistics.add(*count)
+            yield columns
+
+    # run
+    def run(self, batches: Iterable[Batch], n_processes: int = 1) -> Batch:
+        """All the survivors in a single batch (empty if none)."""
+        survivors = [columns for columns in self.iter_run(batches, n_processes)
+                     if len(next(iter(columns.values()))) > 0]
+        if not survivors:
+            return {}
+        return {name: np.concatenate([columns[name] for columns in survivors]) for name in survivors[0]}
+
+
+# state of the worker processes (set once by _init_worker)
+_worker = {}
+
+
+# _init_worker
+def _init_worker(pipeline: TrajectoryPipeline):
+    """Keep the pipeline once per process."""
+    _worker['pipeline'] = pipeline
+
+
+# _process_batch
+def _process_batch(batch: Batch) -> Tuple[Batch, List[Tuple[int, int, float]]]:
+    return _worker['pipeline'].process_batch(batch)
@@ -0,0 +1,141 @@
+import numpy as np
+
+from abc import ABC, abstractmethod
+from numpy import ndarray, isfinite
+from typing import Dict, Tuple
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout
+from src.models.light_beam import get_beam_obstruction
+from src.models.trajectoire import Trajectory, TrajectoryTranslator
+from src.models.wrench import WrenchModel
+
+"""
+Stages of the trajectory pipeline. A batch is a dict of columns (arrays with the same first dimension N).
+Each stage reads some columns, adds its own ones and returns a (N,) boolean mask of the samples that are still
+feasible: the pipeline only gives the survivors to the next stages.
+"""
+
+# Batch
+Batch = Dict[str, ndarray]
+
+
+# get_poses
+def get_poses(batch: Batch) -> PoseBatch:
+    """PoseBatch of the 'centers' and 'angles' (radians, cf TrajectoryTranslator) columns."""
+    return PoseBatch(batch['centers'], batch['angles'], unity=AngleUnityEnum.radian)
+
+
+# Stage
+class Stage(ABC):
+    """Base class of the stages."""
+
+    # name
+    name = 'stage'
+
+    # process
+    @abstractmethod
+    def process(self, batch: Batch) -> Tuple[Batch, ndarray]:
+        """New columns and (N,) mask of the feasible samples."""
+        pass
+
+
+# SunStage
+class SunStage(Stage):
+    """'days', 'seconds' -> 'azimuths', 'altitudes' (degrees), the sun must be over min_altitude."""
+
+    name = 'sun'
+
+    # init
+    def __init__(self, trajectory: Trajectory, min_altitude: float = 0.):
+        """The sun positions come from the trajectory's model (latitude, orientation, backend), None: no limit."""
+        self._trajectory = trajectory
+        self._min_altitude = min_altitude
+
+    # process
+    def process(self, batch: Batch) -> Tuple[Batch, ndarray]:
+        azimuths, altitudes = self._trajectory.get_positions_soleil(batch['seconds'], batch['days'])
+        feasible = altitudes > self._min_altitude if self._min_altitude is not None \
+            else np.ones(altitudes.shape, dtype=bool)
+        return {'azimuths': azimuths, 'altitudes': altitudes}, feasible
+
+
+# PoseStage
+class PoseStage(Stage):
+    """'azimuths', 'altitudes' -> 'centers' (N, 3) and 'angles' (N, 3, radians) of the source."""
+
+    name = 'pose'
+
+    # init
+    def __init__(self, translator: TrajectoryTranslator):
+        self._translator = translator
+
+    # process
+    def process(self, batch: Batch) -> Tuple[Batch, ndarray]:
+        centers, angles = self._translator.get_config_arrays(batch['azimuths'], batch['altitudes'])
+        feasible = np.all(isfinite(centers), axis=1) & np.all(isfinite(angles), axis=1)
+        return {'centers': centers, 'angles': angles}, feasible
+
+
+# KinematicsStage
+class KinematicsStage(Stage):
+    """Inverse kinematics: poses -> 'lengths' (N, C) in mm, within [min_length, max_length]."""
+
+    name = 'ik'
+
+    # init
+    def __init__(self, cable_layout: CableLayout, dimensions: BoxDimensions,
+                 min_length: float = 0., max_length: float = np.inf):
+        assert 0 <= min_length < max_length, f'invalid lengths ({min_length}, {max_length})'
+        self._cable_layout = cable_layout
+        self._dimensions = dimensions
+        self._min_length = min_length
+        self._max_length = max_length
+
+    # process
+    def process(self, batch: Batch) -> Tuple[Batch, ndarray]:
+        lengths = self._cable_layout.get_lengths(get_poses(batch), self._dimensions)
+        feasible = np.all((lengths > self._min_length) & (lengths <= self._max_length), axis=1)
+        return {'lengths': lengths}, feasible
+
+
+# CollisionStage
+class CollisionStage(Stage):
+    """Cables in the light beam: poses -> 'lost_fractions' (N,), at most max_lost_fraction. Cf get_beam_obstruction."""
+
+    name = 'collision'
+
+    # init
+    def __init__(self, cable_layout: CableLayout, dimensions: BoxDimensions, max_lost_fraction: float = 0.,
+                 **kwargs):
+        """kwargs go to get_beam_obstruction (beam_length or window_center, light_radius...)."""
+        assert 0 <= max_lost_fraction <= 1, f'invalid max_lost_fraction ({max_lost_fraction})'
+        self._cable_layout = cable_layout
+        self._dimensions = dimensions
+        self._max_lost_fraction = max_lost_fraction
+        self._kwargs = kwargs
+
+    # process
+    def process(self, batch: Batch) -> Tuple[Batch, ndarray]:
+        lost_fractions = get_beam_obstruction(self._cable_layout, get_poses(batch), self._dimensions,
+                                              **self._kwargs).lost_fractions
+        return {'lost_fractions': lost_fractions}, lost_fractions <= self._max_lost_fraction
+
+
+# TensionStage
+class TensionStage(Stage):
+    """Closed-form force distribution: poses -> 'tensions' (N, C) in N, within the wrench model's limits."""
+
+    name = 'tension'
+
+    # init
+    def __init__(self, wrench_model: WrenchModel, improved: bool = True):
+        self._wrench_model = wrench_model
+        self._improved = improved
+
+    # process
+    def process(self, batch: Batch) -> Tuple[Batch, ndarray]:
+        distribution = self._wrench_model.get_force_distribution(get_poses(batch), improved=self._improved)
+        return {'tensions': distribution.tensions}, distribution.feasible
@@ -0,0 +1,105 @@
+import numpy as np
+
+from src.setups import palaiseau
+from src.enums import AngleUnityEnum, BoxVertexEnum
+from src.math_entities import Point
+from src.models.cables import CableLayout, CableEnds
+
+
+# setup
+stp = palaiseau
+
+# ! everythin in mm ! ! everythin in mm ! ! everythin in mm ! ! everythin in mm ! ! everythin in mm !
+
+"""
+Workspace mapping: feasibility of the force distribution over a grid of poses (positions X orientations).
+The fixation points are the same as in src.simulation.max_tension.configs (from Chloé), X1 is the mobile part.
+One cable layout (straight, no crossed cables) is evaluated for each value of X1, all on the same grid.
+"""
+
+
+class Simulation:
+
+    # number of worker processes (None -> os.cpu_count())
+    n_processes = None
+
+    # number of poses evaluated at once by a worker
+    chunk_size = 20000
+
+    # improved closed form (clamping of the saturated cables) instead of the plain one
+    improved = True
+
+    # where the memory-mapped results (.npy) are written
+    output_dir = 'workspace_results'
+
+
+class Fixation:
+
+    # fix_X0
+    X0 = 1950.
+
+    # values of X1
+    X1_vals = np.array([5000., 7500., 10000.])
+
+    # fix_Y0 and Y1 fixed
+    Y0 = 325.
+    Y1 = 4675.
+
+    # Z0 and Z1 fixed
+    Z0 = 400.
+    Z1 = 3300.
+
+
+class Tension:
+
+    # N
+    f_min = 10.
+    f_max = 1000.
+
+
+class Grid:
+
+    class Center:
+
+        # number of values (x, y, z)
+        x_n = 20
+        y_n = 20
+        z_n = 10
+
+        # the limits are the fixation points minus half the source (cf max_tension)
+        y_min = Fixation.Y0 + stp.Source.Dimensions.width / 2
+        y_max = Fixation.Y1 - stp.Source.Dimensions.width / 2
+        z_min = Fixation.Z0 + stp.Source.Dimensions.height / 2
+        z_max = Fixation.Z1 - stp.Source.Dimensions.height / 2
+        # the same grid for all the layouts (up to the biggest X1) so that their volumes are comparable
+        x_min = Fixation.X0 + stp.Source.Dimensions.length / 2
+        x_max = Fixation.X1_vals.max() - stp.Source.Dimensions.length / 2
+
+    class Orientation:
+
+        # angles unity
+        angles_unity = AngleUnityEnum.degree
+
+        # row (min, max, n)
+        row = (0., 0., 1)
+
+        # pitch (min, max, n)
+        pitch = (-45., 45., 7)
+
+        # yaw (min, max, n)
+        yaw = (-90., 90., 13)
+
+
+def get_cable_layout(X1: float) -> CableLayout:
+    """Straight layout: the vertex sXYZ goes to the fixation XYZ."""
+    xs, ys, zs = (Fixation.X0, X1), (Fixation.Y0, Fixation.Y1), (Fixation.Z0, Fixation.Z1)
+    cables_ends = []
+    for vertex in BoxVertexEnum.list_vertices():
+        i, j, k = (int(c) for c in vertex.name[1:])
+        cables_ends.append(CableEnds(Point(xs[i], ys[j], zs[k], name='PF' + vertex.name[1:]), vertex))
+    return CableLayout(cables_ends)
+
+
+def get_cable_layouts() -> dict:
+    """{name: layout} of all the evaluated layouts."""
+    return {f'X1_{X1:.0f}': get_cable_layout(X1) for X1 in Fixation.X1_vals}
@@ -0,0 +1,49 @@
+import sys
+import time
+
+import numpy as np
+
+from src.models.boxes import BoxDimensions
+from src.simulation.workspace import configs as cfg
+from src.simulation.workspace.mapping import WorkspaceGrid, map_layouts
+
+
+def get_grid():
+    center, orientation = cfg.Grid.Center, cfg.Grid.Orientation
+    return WorkspaceGrid(
+        x=np.linspace(center.x_min, center.x_max, center.x_n),
+        y=np.linspace(center.y_min, center.y_max, center.y_n),
+        z=np.linspace(center.z_min, center.z_max, center.z_n),
+        row=np.linspace(*orientation.row),
+        pitch=np.linspace(*orientation.pitch),
+        yaw=np.linspace(*orientation.yaw),
+        unity=orientation.angles_unity
+    )
+
+
+def main():
+    source = cfg.stp.Source
+    dimensions = BoxDimensions(source.Dimensions.length, source.Dimensions.width, source.Dimensions.height)
+    center_of_mass = (source.CenterOfMass.x, source.CenterOfMass.y, source.CenterOfMass.z)
+    grid = get_grid()
+    print('grid', grid.shape, grid.size, 'poses')
+
+    start = time.time()
+    summaries = map_layouts(cfg.get_cable_layouts(), dimensions, grid, cfg.Simulation.output_dir,
+                            mass=source.mass, center_of_mass=center_of_mass,
+                            f_min=cfg.Tension.f_min, f_max=cfg.Tension.f_max,
+                            n_processes=cfg.Simulation.n_processes, chunk_size=cfg.Simulation.chunk_size,
+                            improved=cfg.Simulation.improved)
+    print(f'{time.time() - start:.1f} s')
+
+    for name, summary in summaries.items():
+        print(name, summary)
+
+
+# main
+if __name__ == '__main__':
+    # arguments
+    args = sys.argv[1:]
+
+    # main call
+    main(*args)
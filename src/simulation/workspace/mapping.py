@@ -0,0 +1,162 @@
+import os
+import numpy as np
+
+from multiprocessing import Pool
+from numpy import ndarray
+from typing import Dict, Tuple
+
+from src.enums import AngleUnityEnum
+from src.math_entities import PoseBatch
+from src.models.boxes import BoxDimensions
+from src.models.cables import CableLayout
+from src.models.wrench import WrenchModel
+
+
+# WorkspaceGrid
+class WorkspaceGrid:
+    """Cartesian grid of poses: the values of x, y, z (mm) and row, pitch, yaw (one axis each)."""
+
+    # init
+    def __init__(self, x: ndarray, y: ndarray, z: ndarray, row: ndarray, pitch: ndarray, yaw: ndarray,
+                 unity: AngleUnityEnum = AngleUnityEnum.degree):
+        """1D arrays of values, unity of the angles."""
+        self._axes = tuple(np.array(values, dtype=float, ndmin=1) for values in (x, y, z, row, pitch, yaw))
+        # validations
+        assert all(axis.ndim == 1 and axis.size > 0 for axis in self._axes), 'The axes must be non empty 1D arrays.'
+        assert unity != AngleUnityEnum.unknown, f'The angle unity cannot be unknown.'
+        self._unity = unity
+
+    # axes
+    @property
+    def axes(self) -> Tuple[ndarray, ...]:
+        """(x, y, z, row, pitch, yaw) values."""
+        return self._axes
+
+    # shape
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """(n_x, n_y, n_z, n_row, n_pitch, n_yaw)"""
+        return tuple(axis.size for axis in self._axes)
+
+    # size
+    @property
+    def size(self) -> int:
+        """Number of poses."""
+        return int(np.prod(self.shape))
+
+    # positions_volume
+    @property
+    def positions_volume(self) -> float:
+        """Volume of the box covered by the positions (mm3), 0 if an axis has a single value."""
+        return float(np.prod([np.ptp(axis) for axis in self._axes[:3]]))
+
+    # get_poses
+    def get_poses(self, start: int, stop: int) -> PoseBatch:
+        """Poses of the flat (C order) indices [start, stop)."""
+        indices = np.unravel_index(np.arange(start, stop), self.shape)
+        values = [axis[index] for axis, index in zip(self._axes, indices)]
+        return PoseBatch(np.stack(values[:3], axis=1), np.stack(values[3:], axis=1), unity=self._unity)
+
+
+# WorkspaceSummary
+class WorkspaceSummary:
+    """Feasible part of a mapped workspace."""
+
+    # init
+    def __init__(self, feasible: ndarray, grid: WorkspaceGrid):
+        """feasible has the grid's shape."""
+        positions = feasible.reshape(feasible.shape[:3] + (-1,))
+        self._n_poses = feasible.size
+        self._n_feasible = int(np.count_nonzero(feasible))
+        n_positions = positions.shape[0] * positions.shape[1] * positions.shape[2]
+        self._any_orientation_fraction = np.count_nonzero(positions.any(axis=-1)) / n_positions
+        self._all_orientations_fraction = np.count_nonzero(positions.all(axis=-1)) / n_positions
+        self._positions_volume = grid.positions_volume
+
+    # feasible_fraction
+    @property
+    def feasible_fraction(self) -> float:
+        """Fraction of the poses with a feasible force distribution."""
+        return self._n_feasible / self._n_poses
+
+    # any_orientation_volume
+    @property
+    def any_orientation_volume(self) -> float:
+        """Volume (m3) of the positions where at least one of the orientations is feasible."""
+        return self._any_orientation_fraction * self._positions_volume * 1e-9
+
+    # all_orientations_volume
+    @property
+    def all_orientations_volume(self) -> float:
+        """Volume (m3) of the positions where all the orientations are feasible."""
+        return self._all_orientations_fraction * self._positions_volume * 1e-9
+
+    # str
+    def __str__(self):
+        return f'{self._n_feasible}/{self._n_poses} feasible poses ({100 * self.feasible_fraction:.1f}%), ' \
+               f'volume with any orientation: {self.any_orientation_volume:.2f} m3, ' \
+               f'with all orientations: {self.all_orientations_volume:.2f} m3'
+
+
+# state of the worker processes (set once by _init_worker)
+_worker = {}
+
+
+# _init_worker
+def _init_worker(wrench_model: WrenchModel, grid: WorkspaceGrid, path: str, improved: bool):
+    """Keep the model and open the results' file once per process."""
+    _worker['wrench_model'] = wrench_model
+    _worker['grid'] = grid
+    _worker['results'] = np.load(path, mmap_mode='r+')
+    _worker['improved'] = improved
+
+
+# _evaluate_chunk
+def _evaluate_chunk(bounds: Tuple[int, int]) -> int:
+    """Evaluate the poses [start, stop) and write them to the results' file, return the number of feasible ones."""
+    start, stop = bounds
+    poses = _worker['grid'].get_poses(start, stop)
+    feasible = _worker['wrench_model'].get_force_distribution(poses, improved=_worker['improved']).feasible
+    _worker['results'].reshape(-1)[start:stop] = feasible
+    return int(np.count_nonzero(feasible))
+
+
+# map_workspace
+def map_workspace(wrench_model: WrenchModel, grid: WorkspaceGrid, path: str, n_processes: int = None,
+                  chunk_size: int = 20000, improved: bool = True) -> ndarray:
+    """
+    Evaluate the feasibility of the force distribution over all the grid's poses.
+    The grid is split in chunks of flat indices shared by a pool of processes (a single process if n_processes == 1),
+    each of them writes directly in the memory-mapped boolean array saved at path (.npy), which is returned (read only).
+    """
+    assert type(chunk_size) == int and chunk_size > 0, 'chunk_size must be an int and > 0.'
+    # results' file
+    results = np.lib.format.open_memmap(path, mode='w+', dtype=bool, shape=grid.shape)
+    del results
+    chunks = [(start, min(start + chunk_size, grid.size)) for start in range(0, grid.size, chunk_size)]
+    arguments = (wrench_model, grid, path, improved)
+    if n_processes == 1:
+        _init_worker(*arguments)
+        for chunk in chunks:
+            _evaluate_chunk(chunk)
+        _worker['results'].flush()
+        _worker.clear()
+    else:
+        with Pool(n_processes, initializer=_init_worker, initargs=arguments) as pool:
+            pool.map(_evaluate_chunk, chunks)
+    return np.load(path, mmap_mode='r')
+
+
+# map_layouts
+def map_layouts(cable_layouts: Dict[str, CableLayout], dimensions: BoxDimensions, grid: WorkspaceGrid,
+                output_dir: str, mass: float = None, center_of_mass: ndarray = None,
+                f_min: float = None, f_max: float = None, **kwargs) -> Dict[str, WorkspaceSummary]:
+    """Map the workspace of each layout (results in output_dir/{name}.npy) and summarize it."""
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = {}
+    for name, cable_layout in cable_layouts.items():
+        wrench_model = WrenchModel.from_cable_layout(cable_layout, dimensions, mass=mass,
+                                                     center_of_mass=center_of_mass, f_min=f_min, f_max=f_max)
+        feasible = map_workspace(wrench_model, grid, os.path.join(output_dir, name + '.npy'), **kwargs)
+        summaries[name] = WorkspaceSummary(np.asarray(feasible), grid)
+    return summaries
@@ -1,5 +1,7 @@
 from math import cos, sin, atan2, pi
 
+import numpy as np
+
 from numpy.core.umath import sqrt
 
 
@@ -7,6 +9,37 @@ def solutions_formule_quadratique(a, b, c):
     return (-b - sqrt(b ** 2 - 4 * a * c)) / 2 / a, (-b + sqrt(b ** 2 - 4 * a * c)) / 2 / a
 
 
+def segments_distances(p1, q1, p2, q2):
+    """
+    Vectorized closest distance between the segments [p1, q1] and [p2, q2] (all (..., 3) arrays, broadcastable).
+    Return the distances and the parameters (s, t) in [0, 1] of the closest points on each segment.
+    Cf. Ericson, Real-Time Collision Detection, 5.1.9.
+    """
+    eps = 1e-12
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a = np.sum(d1 * d1, axis=-1)
+    e = np.sum(d2 * d2, axis=-1)
+    f = np.sum(d2 * r, axis=-1)
+    c = np.sum(d1 * r, axis=-1)
+    b = np.sum(d1 * d2, axis=-1)
+    a_ok, e_ok = a > eps, e > eps
+    safe_a, safe_e = np.where(a_ok, a, 1.), np.where(e_ok, e, 1.)
+    # closest point on the (infinite) first line, clamped to the segment (0 if parallel)
+    denom = a * e - b ** 2
+    s = np.where(denom > eps, np.clip((b * f - c * e) / np.where(denom > eps, denom, 1.), 0., 1.), 0.)
+    # closest point on the second segment
+    t = np.where(e_ok, (b * s + f) / safe_e, 0.)
+    # t out of the segment -> clamp it and recompute s
+    s = np.where(t < 0, np.clip(-c / safe_a, 0., 1.), np.where(t > 1, np.clip((b - c) / safe_a, 0., 1.), s))
+    # degenerate segments (points)
+    s = np.where(e_ok, s, np.clip(-c / safe_a, 0., 1.))
+    s = np.where(a_ok, s, 0.)
+    t = np.clip(t, 0., 1.)
+    # distance between the closest points
+    diff = (p1 + s[..., np.newaxis] * d1) - (p2 + t[..., np.newaxis] * d2)
+    return np.sqrt(np.sum(diff * diff, axis=-1)), s, t
+
+
 def get_plane_normal(surface, verticies, reference_point):
     centre_plane = verticies[surface[0]] + verticies[surface[1]] + verticies[surface[2]] + verticies[surface[3]]
     centre_plane /= 4
@@ -45,7 +78,7 @@ def point_azimut(x, y, x_error=0.001, y_error=0.001):
 
     else:
         if x > 0 and y > 0:
-            return atan2(x, y)
+            return atan2(x, y) * 180 / pi
         elif x > 0 > y:
             return atan2(-y, x) * 180 / pi + 90
         elif x < 0 and y < 0:
@@ -1,10 +1,14 @@
 import time
 
+import numpy as np
+
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from pygame.locals import *
 import pygame
 
+from src.math_entities import Point, Orientation
+from src.models.pose_interpolation import PoseInterpolator
 from src.visualization.trackball import Trackball
 from src.visualization.control.keyboard_controlers import SourceKeyboardController, ViewKeyboardController
 from src.visualization.control.pygame_view_controlable import PygameViewControlable
@@ -36,16 +40,16 @@ class RobotVisualization2:
         self._keyboard_view_controller = ViewKeyboardController(view_controlable=self._view_controlable)
 
     def light_on(self):
-    '''  
-    turns the sun's light on
-    '''
+        '''  
+        turns the sun's light on
+        '''
     
         self.use_shaders = True
 
     def light_off(self):
-    '''
-    turns the sun's light off
-    '''
+        '''
+        turns the sun's light off
+        '''
     
         self.use_shaders = False
 
@@ -55,9 +59,9 @@ class RobotVisualization2:
         self.window_width = width
 
     def set_uniforms(self):
-    '''
-    Initializes uniforms and stores their locations.
-    '''
+        '''
+        Initializes uniforms and stores their locations.
+        '''
     
         print("Setting shaders.")
         self.light_position_uniform = glGetUniformLocation(self.gl_program, "light_position")
@@ -65,27 +69,27 @@ class RobotVisualization2:
         self.light_radius_uniform = glGetUniformLocation(self.gl_program, "light_radius")
 
     def update_uniforms(self):
-    '''
-    Updates the information given to the shaders through the uniforms.
-    '''
+        '''
+        Updates the information given to the shaders through the uniforms.
+        '''
     
         glUniform4fv(self.light_position_uniform, 1, self._cable_robot.light_center - self._cable_robot.get_centre() + (1,))
         glUniform4fv(self.light_direction_uniform, 1, self._cable_robot.light_direction() + (0,))
         glUniform1fv(self.light_radius_uniform, 1, self._cable_robot.light_radius)
 
     def create_window(self):
-    '''
-    Creates a window context for the visualization
-    '''
+        '''
+        Creates a window context for the visualization
+        '''
     
         print("Creating window.")
         pygame.display.set_mode((self.window_width, self.window_height), DOUBLEBUF | OPENGL | RESIZABLE)
         glClearColor(1.0, 1.0, 1.0, 1.0)
 
     def set_opengl_parameters(self):
-    '''
-    Sets some opengl consts.
-    '''
+        '''
+        Sets some opengl consts.
+        '''
     
         print("Setting opengl parameters.")
         #enables z coordinate testing
@@ -101,9 +105,9 @@ class RobotVisualization2:
         print("opengl parameters set.")
 
     def set_shaders(self):
-    '''
-    Initializes the shaders, this function won't be used if the lights are off
-    '''
+        '''
+        Initializes the shaders, this function won't be used if the lights are off
+        '''
     
         print("Setting shaders.")
         v = glCreateShader(GL_VERTEX_SHADER)
@@ -136,13 +140,13 @@ class RobotVisualization2:
         quit()
 
     def reset_mvt_variables(self):
-    '''
-    #resets/initializes all the mvt variables to make sure there isn't anything moving
-    #CW = clockwise
-    #CCW = counter clockwise
-    #pos = positive
-    #neg = negative
-    '''
+        '''
+        #resets/initializes all the mvt variables to make sure there isn't anything moving
+        #CW = clockwise
+        #CCW = counter clockwise
+        #pos = positive
+        #neg = negative
+        '''
         print("Resetting mvt variables.")
         self.rotateX_CW = False
         self.rotateX_CCW = False
@@ -162,10 +166,10 @@ class RobotVisualization2:
         self.rotate_source_row_pos = False
 
     def reset_viewer_matrix(self):
-    '''
-    resets the camera to the initial position and rotation,
-    very useful  when trackball does crazy things
-    '''
+        '''
+        resets the camera to the initial position and rotation,
+        very useful  when trackball does crazy things
+        '''
     
         glLoadIdentity()
         gluPerspective(45, (self.window_width / self.window_height), 0.1, 50.0)
@@ -174,10 +178,10 @@ class RobotVisualization2:
         glScalef(0.001, 0.001, 0.001)
 
     def manage_events(self):
-    ''' 
-    Function to manage the keyboard/mouse events. 
-    It is responsible for changing the mvt variables when an event is detected
-    '''
+        ''' 
+        Function to manage the keyboard/mouse events. 
+        It is responsible for changing the mvt variables when an event is detected
+        '''
      
         #iterate over all the events detected by pygame and changes the mvt variable that corresponds to the event 
         for event in pygame.event.get():
@@ -211,9 +215,9 @@ class RobotVisualization2:
                     quit()
 
     def show(self):
-    """
-    draws a static cable robot
-    """
+        """
+        draws a static cable robot
+        """
     
         print("start drawing....")
         self.create_window()
@@ -236,14 +240,17 @@ class RobotVisualization2:
             pygame.display.flip()
             #pygame.time.wait(10)
 
-    def draw_trajectory(self, trajectory, time_step, speed):
-    """
-    draws a trajectory
-    :param trajectory: Trajectory object
-    :param time_step: time_step: time in ms between two position in the trajectory
-    :param speed: speed of the trajectory, i.e. how many ms of trajectory will be shown in 1 ms
-    """
+    def draw_trajectory(self, trajectory, time_step=None, speed=1.0):
+        """
+        draws a trajectory, interpolated at the display's rate (it stays at the last pose after the end)
+        :param trajectory: PoseInterpolator, or PoseBatch of poses sampled every time_step
+        :param time_step: time in s between two poses of a PoseBatch
+        :param speed: speed of the trajectory, i.e. how many s of trajectory will be shown in 1 s
+        """
     
+        if not isinstance(trajectory, PoseInterpolator):
+            assert time_step and time_step > 0, 'time_step is needed to interpolate a PoseBatch.'
+            trajectory = PoseInterpolator(time_step * np.arange(len(trajectory)), trajectory)
         print("start drawing....")
         self.create_window()
         self.set_opengl_parameters()
@@ -259,9 +266,9 @@ class RobotVisualization2:
             if(self.use_shaders):
                 self.update_uniforms()
             glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
-            i = int((time.time() - initial_time)/time_step)
-            self._cable_robot.set_source_position(trajectory[i].position)
-            self._cable_robot.set_source_angles(trajectory[i].angles)
+            pose = trajectory.get_poses(trajectory.start + speed * (time.time() - initial_time))
+            orientation = Orientation(*pose.angles[0].tolist(), order=pose.order, unity=pose.unity)
+            self._cable_robot.set_source_configuration(Point(*pose.centers[0].tolist()), orientation)
 
             self._cable_robot.draw(origin)
             pygame.display.flip()